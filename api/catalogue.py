@@ -0,0 +1,159 @@
+import gzip
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from time import monotonic
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+
+@dataclass(frozen=True)
+class ContentBundle:
+    content_hash: str
+    compressed: bytes
+
+    def decompress(self):
+        return gzip.decompress(self.compressed)
+
+
+class WordSetWords:
+    """
+    Immutable words of one wordset, stored as parallel tuples.
+    """
+    __slots__ = ("ids", "english", "polish", "_english_words", "_bundle")
+
+    def __init__(self, ids, english, polish):
+        self.ids = tuple(ids)
+        self.english = tuple(english)
+        self.polish = tuple(polish)
+        self._english_words = frozenset(self.english)
+        self._bundle = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def as_dicts(self):
+        """
+        Returns a new list of the words, which the caller is free to modify.
+        """
+        return [
+            {"polish": polish, "english": english, "id": translation_id}
+            for translation_id, english, polish in zip(self.ids, self.english, self.polish)
+        ]
+
+    def has_english(self, word):
+        return word in self._english_words
+
+    def get_bundle(self):
+        """
+        Returns the words as gzip-compressed JSON, built on first use. The hash
+        of the content identifies it across processes and catalogue reloads.
+        """
+        if self._bundle is None:
+            content = json.dumps(self.as_dicts(), ensure_ascii=False, separators=(",", ":")).encode()
+            self._bundle = ContentBundle(hashlib.sha256(content).hexdigest(), gzip.compress(content, mtime=0))
+        return self._bundle
+
+
+EMPTY_WORDSET = WordSetWords((), (), ())
+
+
+class TranslationCatalogue:
+    """
+    Words of every wordset, loaded with a single query and kept in memory.
+    """
+    __slots__ = ("version", "_wordsets")
+
+    def __init__(self, version, wordsets):
+        self.version = version
+        self._wordsets = wordsets
+
+    @classmethod
+    def load(cls, version):
+        through = apps.get_model("api", "WordSet").words.through
+        rows = (
+            through.objects
+            .order_by("wordset_id", "translation_id")
+            .values_list("wordset_id", "translation_id", "translation__english", "translation__polish")
+        )
+
+        columns = {}
+        for wordset_id, translation_id, english, polish in rows.iterator():
+            ids, english_words, polish_words = columns.setdefault(wordset_id, ([], [], []))
+            ids.append(translation_id)
+            english_words.append(english)
+            polish_words.append(polish)
+
+        return cls(version, {wordset_id: WordSetWords(*words) for wordset_id, words in columns.items()})
+
+    def get_wordset(self, wordset_id):
+        return self._wordsets.get(wordset_id, EMPTY_WORDSET)
+
+
+# Seconds a loaded catalogue is served before the shared version is checked again
+CATALOGUE_VERSION_CHECK_INTERVAL = 5
+
+_catalogue = None
+_catalogue_checked_at = None
+_catalogue_lock = threading.Lock()
+
+
+def get_catalogue_version():
+    CatalogueVersion = apps.get_model("api", "CatalogueVersion")
+    return CatalogueVersion.objects.values_list("version", flat=True).first() or 0
+
+
+def bump_catalogue_version():
+    """
+    Makes every process reload the catalogue. The shared version is updated in
+    the current transaction, so it becomes visible together with the changes.
+    """
+    CatalogueVersion = apps.get_model("api", "CatalogueVersion")
+    if not CatalogueVersion.objects.update(version=F("version") + 1):
+        CatalogueVersion.objects.create(version=1)
+    # This process doesn't wait for the next check
+    transaction.on_commit(expire_translation_catalogue)
+
+
+def expire_translation_catalogue():
+    global _catalogue_checked_at
+    _catalogue_checked_at = None
+
+
+def get_translation_catalogue():
+    """
+    Returns the process-wide catalogue. The shared version is read at most
+    once every `CATALOGUE_VERSION_CHECK_INTERVAL` seconds and the catalogue
+    is reloaded when it changed, so games read words without touching the
+    database and see changes made by other processes within the interval.
+    """
+    global _catalogue, _catalogue_checked_at
+    catalogue, checked_at = _catalogue, _catalogue_checked_at
+    if catalogue is not None and checked_at is not None and monotonic() - checked_at < CATALOGUE_VERSION_CHECK_INTERVAL:
+        return catalogue
+
+    with _catalogue_lock:
+        checked_at = _catalogue_checked_at
+        if _catalogue is None or checked_at is None or monotonic() - checked_at >= CATALOGUE_VERSION_CHECK_INTERVAL:
+            _catalogue_checked_at = monotonic()
+            version = get_catalogue_version()
+            if _catalogue is None or _catalogue.version != version:
+                _catalogue = TranslationCatalogue.load(version)
+        return _catalogue
+
+
+def catalogue_changed(sender, **kwargs):
+    bump_catalogue_version()
+
+
+def connect_catalogue_signals():
+    WordSet = apps.get_model("api", "WordSet")
+    Translation = apps.get_model("api", "Translation")
+    for model in (WordSet, Translation):
+        post_save.connect(catalogue_changed, sender=model, dispatch_uid=f"catalogue-save-{model.__name__}")
+        post_delete.connect(catalogue_changed, sender=model, dispatch_uid=f"catalogue-delete-{model.__name__}")
+    m2m_changed.connect(catalogue_changed, sender=WordSet.words.through, dispatch_uid="catalogue-wordset-words")
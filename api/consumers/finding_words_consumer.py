@@ -10,6 +10,7 @@ from api.consumers.messages import (
     GameFinalResultMessage
 )
 from api.consumers.waitroom_consumer import DEFAULT_TIMEOUT, WaitListConsumer
+from api.ranking import rank_players
 from api.models import FindingWordsActiveGame, GamePlayer, FindingWordsGameSession, WaitingRoom
 
 
@@ -102,8 +103,8 @@ class FindingWordsConsumer(WaitListConsumer):
 
     @database_sync_to_async
     def create_game_results_message(self):
-        players_with_scores = self.active_game.players.values('user__username', 'score')
-        game_result_message = GameFinalResultMessage.create_from_players(list(players_with_scores))
+        ranked_players = rank_players(self.active_game.players.all())
+        game_result_message = GameFinalResultMessage.create_from_players(ranked_players)
         return game_result_message.to_json()
 
     @database_sync_to_async
@@ -3,6 +3,8 @@ from enum import Enum, auto
 from random import shuffle, sample
 from typing import List
 
+from api.catalogue import get_translation_catalogue
+
 class SocketGameState(Enum):
     JUST_CONNECTED: int = auto()
     IN_WAITROOM: int = auto()
@@ -40,7 +42,7 @@ def get_race_rounds(words) -> List[RaceRound]:
 
 
 def get_words_for_play(wordset):
-    return list(wordset.words.all().values("polish", "english", "id"))
+    return get_translation_catalogue().get_wordset(wordset.pk).as_dicts()
 
 @dataclass
 class FindingWordsRound:
@@ -68,6 +68,7 @@ class GameStartingMessage(WebSocketMessage):
 class PlayerResult(TypedDict):
     user__username: str
     score: int
+    place: int
 
 class PlayerResultDisplay(TypedDict):
     username: str
@@ -80,24 +81,15 @@ class GameFinalResultMessage(WebSocketMessage):
     type: str = WaitroomMessageType.FINAL_RESULT
 
     @classmethod
-    def create_from_players(cls, players_with_scores: List[PlayerResult]):
-        players_with_scores.sort(key=lambda r: r["score"], reverse=True)
-
-        place = 0
-        place_score = None
-
-        scoreboard: List[PlayerResultDisplay] = []
-
-        for player_result in players_with_scores:
-            if player_result["score"] != place_score:
-                place += 1
-                place_score = player_result["score"]
-            
-            scoreboard.append({
+    def create_from_players(cls, ranked_players: List[PlayerResult]):
+        scoreboard: List[PlayerResultDisplay] = [
+            {
                 "username": player_result["user__username"],
                 "score": player_result["score"],
-                "place": place
-            })
+                "place": player_result["place"]
+            }
+            for player_result in ranked_players
+        ]
 
         return cls(scoreboard=scoreboard)
 
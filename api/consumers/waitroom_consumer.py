@@ -7,6 +7,7 @@ from api.consumers.helpers import SocketGameState
 from api.consumers.messages import GameStartingMessage, JoinedWaitroomMessage, PlayerInvitationMessage, PlayerJoinedMessage, PlayerLeftMessage, StartGameMessage, WaitroomCanceledMessage, WaitroomMessageType, WaitroomRequestMessage
 from api.consumers.updates_consumer import UpdatesConsumer, send_update_async
 from api.models import ActiveMultiplayerGame, CustomUser, WaitingRoom, WordSet
+from api.wordset_unlocks import evaluate_wordset_unlocks
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -307,7 +308,7 @@ def get_wordset(wordset_id: str):
 
 @database_sync_to_async
 def is_wordset_locked_for_user(user: CustomUser, wordset: WordSet) -> bool:
-    return wordset.is_locked_for_user(user)
+    return evaluate_wordset_unlocks(user)[wordset.pk].locked
 
 @database_sync_to_async
 def have_all_players_answered(game: ActiveMultiplayerGame) -> int:
@@ -0,0 +1,131 @@
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from api.helpers import get_level_for_score, is_integer
+from api.models import CustomUser, GameSession, ScoreHistory, WordSet, GAME_NAMES_MODELS_MAPPING
+
+SINGLE_PLAYER_GAMES = ("memory", "falling_words")
+MAX_SUBMITTED_SESSIONS = 500
+# Largest value the integer columns of sessions and score history can hold
+MAX_INTEGER = 2 ** 31 - 1
+
+
+class GameSessionRows:
+    """
+    Lean rows of game sessions, read with a single query. Only the requested
+    fields are selected, so no model instances are built.
+    """
+
+    def __init__(self, fields, **filters):
+        self.fields = tuple(fields)
+        self.queryset = GameSession.objects.filter(**filters).values(*self.fields)
+
+    def __iter__(self):
+        return iter(self.queryset)
+
+    def as_sql(self):
+        """
+        Returns SQL and params of a query selecting the rows with the field names as columns.
+        """
+        sql, params = self.queryset.query.sql_with_params()
+        return f"SELECT * FROM ({sql}) sessions ({', '.join(self.fields)})", params
+
+    def sum(self, field):
+        return self.queryset.aggregate(total=Sum(field))["total"] or 0
+
+
+def get_game_session_rows(game, fields, **filters):
+    """
+    Returns session rows of the game ('all_games' for every game),
+    or None when the game name is unknown.
+    """
+    if game in GAME_NAMES_MODELS_MAPPING:
+        filters["game_name"] = game
+    elif game != "all_games":
+        return None
+
+    return GameSessionRows(fields, **filters)
+
+
+def validate_session_submission(submission, wordset_ids):
+    """
+    Returns errors of one submitted session, keyed by field name.
+    """
+    if not isinstance(submission, dict):
+        return {"session": "Must be an object."}
+
+    errors = {}
+    if submission.get("game") not in SINGLE_PLAYER_GAMES:
+        errors["game"] = "Must be one of: " + ", ".join(SINGLE_PLAYER_GAMES)
+    if not is_integer(submission.get("wordset")):
+        errors["wordset"] = "Must be a wordset id."
+    elif submission["wordset"] not in wordset_ids:
+        errors["wordset"] = "Wordset does not exist."
+    for field in ("score", "duration"):
+        value = submission.get(field, 0 if field == "duration" else None)
+        if not is_integer(value) or not 0 <= value <= MAX_INTEGER:
+            errors[field] = f"Must be an integer from 0 to {MAX_INTEGER}."
+    return errors
+
+
+def submit_game_sessions(user, submissions, played_at=None):
+    """
+    Saves many single-player sessions of the user at once, e.g. played
+    offline. Invalid sessions are skipped, the valid ones are written in one
+    transaction: sessions and score history with bulk inserts, the user's
+    score and level with one update and the rest by `GameSession.record_results`.
+    `played_at` holds the time of every session when it's not now.
+    Returns a result for every submitted session, in order.
+    """
+    now = timezone.now()
+    played_at = played_at or [now] * len(submissions)
+    wordsets = WordSet.objects.in_bulk({
+        submission["wordset"] for submission in submissions
+        if isinstance(submission, dict) and is_integer(submission.get("wordset"))
+    })
+
+    results = [{"index": index} for index in range(len(submissions))]
+    valid = []
+    for result, submission, moment in zip(results, submissions, played_at):
+        errors = validate_session_submission(submission, wordsets)
+        if errors:
+            result.update(status="invalid", errors=errors)
+        else:
+            valid.append((result, submission, moment))
+
+    if not valid:
+        return results
+
+    with transaction.atomic():
+        history = ScoreHistory.objects.bulk_create(
+            ScoreHistory(user=user, date=moment, game_name=submission["game"], score_gained=submission["score"])
+            for _, submission, moment in valid
+        )
+
+        sessions = GameSession.objects.bulk_create(
+            GameSession(
+                user=user,
+                wordset=wordsets[submission["wordset"]],
+                score=submission["score"],
+                duration=submission.get("duration", 0),
+                timestamp=history_entry.date,
+                game_name=submission["game"],
+            )
+            for (_, submission, _), history_entry in zip(valid, history)
+        )
+        for (result, submission, _), session in zip(valid, sessions):
+            result.update(status="created", game=submission["game"], id=session.pk)
+
+        total_score = sum(session.score for session in sessions)
+        CustomUser.objects.filter(pk=user.pk).update(score=F("score") + total_score)
+        user.refresh_from_db(fields=["score", "level"])
+        level = get_level_for_score(user.score)
+        if level > user.level:
+            CustomUser.objects.filter(pk=user.pk).update(level=Greatest("level", level))
+            user.level = level
+
+        GameSession.record_results(user, sessions)
+
+    return results
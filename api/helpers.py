@@ -1,14 +1,27 @@
-from datetime import timedelta
+from datetime import timedelta, timezone as dt_timezone
 from django.utils import timezone
 
 
 def calculate_current_week_start():
-    today = timezone.now().date()
-    start_of_the_week = today - timedelta(days=today.weekday())
-    return start_of_the_week
+    return calculate_week_start(timezone.now())
+
+
+def calculate_week_start(moment):
+    day = moment.astimezone(dt_timezone.utc).date()
+    return day - timedelta(days=day.weekday())
+
+
+def is_integer(value):
+    # bool is a subclass of int, but True is no id or score
+    return isinstance(value, int) and not isinstance(value, bool)
 
 
 def get_score_goal_for_level(level):
     return 300 * (2 ** level)
 
 
+def get_level_for_score(score):
+    """
+    Highest level whose score goal is reached, the inverse of `get_score_goal_for_level`.
+    """
+    return max(1, (score // 300).bit_length() - 1)
@@ -0,0 +1,65 @@
+import gzip
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.partitions import PARTITIONED_TABLES, add_months, archive_partition, get_month_start, get_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves monthly partitions of game sessions and score history older than the given number of "
+        "months into gzipped CSV files (one per partition) and drops them. Rollups such as daily "
+        "scores, activity days, streaks, leaderboards and wordset progress are kept. Endpoints that "
+        "read the rows themselves silently lose the archived months: the activity heatmap "
+        "(statistics/activity/), game points (statistics/game-points/) and the game session lists. "
+        "Only archive months older than any range clients still ask those for."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output_dir", type=Path)
+        parser.add_argument("--older-than", type=int, default=12, help="Age in months of archived partitions.")
+        parser.add_argument("--dry-run", action="store_true", help="List the partitions without archiving them.")
+
+    def handle(self, **options):
+        if options["older_than"] < 1:
+            raise CommandError("Only partitions of finished months can be archived, --older-than must be at least 1.")
+        cutoff = add_months(get_month_start(datetime.now(timezone.utc)), -options["older_than"])
+        output_dir = options["output_dir"]
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        with connection.cursor() as cursor:
+            cold_partitions = [(table, name) for table in PARTITIONED_TABLES
+                               for name, month in get_partitions(cursor, table) if month < cutoff]
+
+        for table, name in cold_partitions:
+            if options["dry_run"]:
+                self.stdout.write(f"Would archive {name}")
+                continue
+
+            # The partition is only dropped once its files are complete on disk
+            with transaction.atomic(), connection.cursor() as cursor:
+                archived_rows = archive_partition(cursor, table, name, partial(self.open_archive, output_dir))
+            self.stdout.write(f"Archived {archived_rows} rows of {name} to {output_dir}")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {len(cold_partitions)} partitions older than {cutoff:%Y-%m}"))
+
+    @staticmethod
+    @contextmanager
+    def open_archive(output_dir, archive_name):
+        """
+        Opens a gzipped CSV file, which only gets its final name once it is fully written and synced.
+        """
+        path = output_dir / f"{archive_name}.csv.gz"
+        partial_path = path.with_name(path.name + ".partial")
+        with open(partial_path, "wb") as raw_file:
+            with gzip.GzipFile(filename=f"{archive_name}.csv", mode="wb", fileobj=raw_file) as file:
+                yield file
+            raw_file.flush()
+            os.fsync(raw_file.fileno())
+        os.replace(partial_path, path)
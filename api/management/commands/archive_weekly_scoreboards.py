@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.scoreboard import archive_week, get_unarchived_weeks
+
+
+class Command(BaseCommand):
+    help = "Archives scoreboards of finished weeks. Meant to be run periodically, e.g. every Monday."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=100, help="Number of top places stored in a snapshot.")
+
+    def handle(self, **options):
+        for week_start in list(get_unarchived_weeks()):
+            snapshot = archive_week(week_start, options["top"])
+            self.stdout.write(f"Archived week starting {week_start} ({snapshot.last_place} places)")
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import DailyScore, ScoreHistory
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily score rollup from the whole score history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, **options):
+        chunk_size = options["chunk_size"]
+
+        # History is streamed ordered by user and date, so every rollup row
+        # is complete once the stream moves past its user and day
+        history = (
+            ScoreHistory.objects
+            .order_by("user_id", "date")
+            .values_list("user_id", "date", "game_name", "score_gained")
+            .iterator(chunk_size=chunk_size)
+        )
+
+        with transaction.atomic():
+            DailyScore.objects.all().delete()
+
+            pending = {}
+            current_key = None
+            history_rows = 0
+            created_rows = 0
+            for user_id, date, game_name, score_gained in history:
+                day = timezone.localdate(date)
+                if (user_id, day) != current_key and len(pending) >= chunk_size:
+                    created_rows += self.flush(pending)
+                current_key = (user_id, day)
+
+                daily_score = pending.setdefault(
+                    (user_id, day, game_name),
+                    DailyScore(user_id=user_id, day=day, game_name=game_name),
+                )
+                daily_score.points += score_gained
+                daily_score.sessions += 1
+
+                history_rows += 1
+                if history_rows % chunk_size == 0:
+                    self.stdout.write(f"Processed {history_rows} history rows")
+
+            created_rows += self.flush(pending)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {history_rows} history rows into {created_rows} daily scores"))
+
+    @staticmethod
+    def flush(pending):
+        DailyScore.objects.bulk_create(pending.values())
+        created_rows = len(pending)
+        pending.clear()
+        return created_rows
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.game_sessions import get_game_session_rows
+from api.models import UNLOCK_WORDSET_THRESHOLD, WordSetProgress
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-user wordset progress from all game sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, **options):
+        chunk_size = options["chunk_size"]
+        sessions_sql, sessions_params = get_game_session_rows(
+            "all_games", ("user_id", "wordset_id", "score")).as_sql()
+
+        with transaction.atomic():
+            WordSetProgress.objects.all().delete()
+
+            created_rows = 0
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT sessions.user_id, sessions.wordset_id, SUM(sessions.score) FROM ({sessions_sql}) sessions "
+                    f"GROUP BY sessions.user_id, sessions.wordset_id",
+                    sessions_params,
+                )
+                while rows := cursor.fetchmany(chunk_size):
+                    WordSetProgress.objects.bulk_create(
+                        WordSetProgress(user_id=user_id, wordset_id=wordset_id, points=points,
+                                        unlocked=points >= UNLOCK_WORDSET_THRESHOLD)
+                        for user_id, wordset_id, points in rows
+                    )
+                    created_rows += len(rows)
+                    self.stdout.write(f"Created {created_rows} progress rows")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt progress of {created_rows} user wordsets"))
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.write_behind import game_result_spool
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes all game results left in the write-behind spool to the database. Run it when the "
+        "server is stopped, e.g. before moving to a new host or turning write-behind off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.GAME_RESULTS_WRITE_BATCH_SIZE)
+
+    def handle(self, **options):
+        written = 0
+        while batch_written := game_result_spool.write_batch(options["batch_size"]):
+            written += batch_written
+            self.stdout.write(f"Wrote {written} game results")
+
+        self.stdout.write(self.style.SUCCESS(f"Spool is empty, wrote {written} game results"))
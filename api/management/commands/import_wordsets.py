@@ -0,0 +1,158 @@
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.catalogue import bump_catalogue_version
+from api.models import Translation, WordSet, WordSetCategory
+
+FORMATS = ("csv", "jsonl")
+REQUIRED_COLUMNS = ("wordset", "english", "polish")
+TRANSLATION_MAX_LENGTH = Translation._meta.get_field("english").max_length
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports wordsets from CSV or JSON Lines files. Every row is one translation with the columns "
+        "wordset, wordset_polish, category, difficulty, english and polish (only wordset, english and "
+        "polish are required). Translations already in the database are reused, wordsets are matched "
+        "by their English name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="+", type=Path)
+        parser.add_argument("--format", choices=FORMATS, help="Input format, guessed from the file extension by default.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be imported without saving it.")
+
+    def handle(self, **options):
+        self.batch_size = options["batch_size"]
+        self.wordsets = {english: wordset_id for wordset_id, english in WordSet.objects.values_list("id", "english")}
+        self.stats = {"rows": 0, "wordsets": 0, "translations": 0, "links": 0}
+
+        with transaction.atomic():
+            for path in options["files"]:
+                rows = self.read_rows(path, options["format"] or self.guess_format(path))
+                while batch := list(islice(rows, self.batch_size)):
+                    self.import_batch(batch)
+                    self.stdout.write(f"{path}: imported {self.stats['rows']} rows")
+
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+            else:
+                # Bulk inserts send no signals. The shared version commits with the imported rows
+                bump_catalogue_version()
+
+        summary = (f"{self.stats['rows']} rows: created {self.stats['wordsets']} wordsets, "
+                   f"{self.stats['translations']} translations and {self.stats['links']} wordset words")
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"Dry run, nothing was saved. {summary}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported {summary}"))
+
+    @staticmethod
+    def guess_format(path):
+        if path.suffix.lower() == ".csv":
+            return "csv"
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            return "jsonl"
+        raise CommandError(f"Cannot guess the format of {path}, pass --format.")
+
+    @staticmethod
+    def read_rows(path, file_format):
+        """
+        Yields (line number, row) pairs of the file without reading it whole.
+        """
+        try:
+            # Spreadsheet programs start UTF-8 CSV files with a byte order mark
+            with open(path, newline="", encoding="utf-8-sig") as file:
+                if file_format == "csv":
+                    reader = csv.DictReader(file)
+                    for row in reader:
+                        yield reader.line_num, row
+                else:
+                    for line_number, line in enumerate(file, start=1):
+                        if line.strip():
+                            yield line_number, json.loads(line)
+        except OSError as error:
+            raise CommandError(f"Cannot read {path}: {error}")
+        except json.JSONDecodeError as error:
+            raise CommandError(f"{path}: invalid JSON: {error}")
+
+    def import_batch(self, batch):
+        rows = []
+        for line_number, row in batch:
+            if not isinstance(row, dict) or any(not str(row.get(column) or "").strip() for column in REQUIRED_COLUMNS):
+                raise CommandError(f"Line {line_number}: every row needs {', '.join(REQUIRED_COLUMNS)}.")
+            row = {key: str(value).strip() for key, value in row.items() if value is not None}
+            if len(row["english"]) > TRANSLATION_MAX_LENGTH or len(row["polish"]) > TRANSLATION_MAX_LENGTH:
+                raise CommandError(f"Line {line_number}: translations can be at most {TRANSLATION_MAX_LENGTH} characters.")
+            rows.append(row)
+
+        for row in rows:
+            if row["wordset"] not in self.wordsets:
+                self.wordsets[row["wordset"]] = self.create_wordset(row).pk
+
+        translation_ids = self.get_translation_ids({(row["english"], row["polish"]) for row in rows})
+
+        links = {(self.wordsets[row["wordset"]], translation_ids[(row["english"], row["polish"])]) for row in rows}
+        link_wordset_ids, link_translation_ids = zip(*links)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT link.wordset_id, link.translation_id FROM {WordSet.words.through._meta.db_table} link "
+                f"JOIN unnest(%s::bigint[], %s::bigint[]) pair (wordset_id, translation_id) "
+                f"ON link.wordset_id = pair.wordset_id AND link.translation_id = pair.translation_id",
+                (list(link_wordset_ids), list(link_translation_ids)),
+            )
+            existing_links = set(cursor.fetchall())
+        WordSet.words.through.objects.bulk_create(
+            WordSet.words.through(wordset_id=wordset_id, translation_id=translation_id)
+            for wordset_id, translation_id in links - existing_links
+        )
+
+        self.stats["rows"] += len(rows)
+        self.stats["links"] += len(links - existing_links)
+
+    def create_wordset(self, row):
+        # Optional cells may be present but blank
+        category = row.get("category") or WordSetCategory.GENERAL
+        if category not in WordSetCategory.values:
+            raise CommandError(f"Unknown category '{category}' of wordset '{row['wordset']}'.")
+        try:
+            difficulty = int(row.get("difficulty") or 1)
+        except ValueError:
+            raise CommandError(f"Difficulty of wordset '{row['wordset']}' must be an integer.")
+
+        self.stats["wordsets"] += 1
+        return WordSet.objects.create(english=row["wordset"], polish=row.get("wordset_polish") or row["wordset"],
+                                      category=category, difficulty=difficulty)
+
+    def get_translation_ids(self, pairs):
+        """
+        Returns ids of the (english, polish) pairs, creating the missing translations.
+        Translations created by earlier batches are found in the database like any other.
+        """
+        english_words, polish_words = zip(*pairs)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT translation.id, translation.english, translation.polish "
+                f"FROM {Translation._meta.db_table} translation "
+                f"JOIN unnest(%s::text[], %s::text[]) pair (english, polish) "
+                f"ON translation.english = pair.english AND translation.polish = pair.polish "
+                f"ORDER BY translation.id DESC",
+                (list(english_words), list(polish_words)),
+            )
+            existing = cursor.fetchall()
+        # Ordered by descending id, so the oldest of duplicated translations wins
+        translation_ids = {(english, polish): translation_id for translation_id, english, polish in existing}
+
+        created = Translation.objects.bulk_create(
+            Translation(english=english, polish=polish) for english, polish in pairs - translation_ids.keys()
+        )
+        translation_ids.update({(translation.english, translation.polish): translation.pk for translation in created})
+        self.stats["translations"] += len(created)
+
+        return translation_ids
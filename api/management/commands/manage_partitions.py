@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.partitions import PARTITIONED_TABLES, add_months, create_month_partition, get_default_partition_months, \
+    get_month_start, get_partition_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the monthly partitions of game sessions and score history for the coming months and "
+        "moves rows out of the default partitions into partitions of their months. Meant to be run "
+        "periodically, e.g. every week."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=3, help="Number of future months to create.")
+
+    def handle(self, **options):
+        this_month = get_month_start(datetime.now(timezone.utc))
+        upcoming_months = [add_months(this_month, months) for months in range(options["months_ahead"] + 1)]
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for table, column in PARTITIONED_TABLES.items():
+                months = sorted(set(upcoming_months) | set(get_default_partition_months(cursor, table, column)))
+                for month in months:
+                    if create_month_partition(cursor, table, column, month):
+                        self.stdout.write(f"Created {get_partition_name(table, month)}")
+
+        self.stdout.write(self.style.SUCCESS("Partitions are up to date"))
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from api.models import UserActivityDay, UserStreak
+from api.statistics import get_activity_days, get_streaks
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the stored streaks of users from their activity history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, help="Only rebuild streaks of the user with this id.")
+
+    def handle(self, **options):
+        users = UserActivityDay.objects.values("user").annotate(last_active_day=Max("day"))
+        if options["user"]:
+            users = users.filter(user=options["user"])
+
+        rebuilt = 0
+        for row in users.order_by("user").iterator():
+            last_active_day = row["last_active_day"]
+            # Streak "current" as of the last active day is the one the next game continues
+            streaks = get_streaks(get_activity_days(row["user"], "all_games"), last_active_day)
+            UserStreak.objects.update_or_create(user_id=row["user"], defaults={
+                "current_streak": streaks.current,
+                "current_streak_start": last_active_day - timedelta(days=streaks.current - 1),
+                "longest_streak": streaks.longest,
+                "longest_streak_start": streaks.longest_start,
+                "longest_streak_end": streaks.longest_end,
+                "last_active_day": last_active_day,
+            })
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt streaks of {rebuilt} users"))
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:05
+
+import datetime
+
+from django.db import migrations
+from django.db.models import Sum
+from django.db.models.functions import TruncWeek
+
+ALL_TIME_PERIOD_START = datetime.date(1970, 1, 1)
+
+
+def populate_leaderboard(apps, schema_editor):
+    ScoreHistory = apps.get_model("api", "ScoreHistory")
+    LeaderboardEntry = apps.get_model("api", "LeaderboardEntry")
+
+    entries = [
+        LeaderboardEntry(
+            user_id=row["user"],
+            period="all_time",
+            period_start=ALL_TIME_PERIOD_START,
+            points=row["points"],
+        )
+        for row in ScoreHistory.objects.values("user").annotate(
+            points=Sum("score_gained")
+        )
+    ]
+    entries += [
+        LeaderboardEntry(
+            user_id=row["user"],
+            period="week",
+            period_start=row["week"].date(),
+            points=row["points"],
+        )
+        for row in ScoreHistory.objects.annotate(week=TruncWeek("date"))
+        .values("user", "week")
+        .annotate(points=Sum("score_gained"))
+    ]
+    LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0026_leaderboardentry"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0027_populate_leaderboardentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardRankIndex",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("all_time", "All time"), ("week", "Week")],
+                        max_length=16,
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("points", models.PositiveIntegerField()),
+                ("users_count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "unique_together": {("period", "period_start", "points")},
+            },
+        ),
+    ]
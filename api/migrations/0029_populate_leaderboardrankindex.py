@@ -0,0 +1,35 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:30
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def populate_rank_index(apps, schema_editor):
+    LeaderboardEntry = apps.get_model("api", "LeaderboardEntry")
+    LeaderboardRankIndex = apps.get_model("api", "LeaderboardRankIndex")
+
+    LeaderboardRankIndex.objects.bulk_create(
+        [
+            LeaderboardRankIndex(
+                period=row["period"],
+                period_start=row["period_start"],
+                points=row["points"],
+                users_count=row["users_count"],
+            )
+            for row in LeaderboardEntry.objects.values(
+                "period", "period_start", "points"
+            ).annotate(users_count=Count("id"))
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0028_leaderboardrankindex"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_rank_index, migrations.RunPython.noop),
+    ]
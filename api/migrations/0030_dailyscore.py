@@ -0,0 +1,49 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0029_populate_leaderboardrankindex"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyScore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("game_name", models.CharField(max_length=20)),
+                ("points", models.PositiveIntegerField(default=0)),
+                ("sessions", models.PositiveIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_scores",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["day", "game_name"], name="dailyscore_day_game_idx"
+                    )
+                ],
+                "unique_together": {("user", "day", "game_name")},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:06
+
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_daily_scores(apps, schema_editor):
+    ScoreHistory = apps.get_model("api", "ScoreHistory")
+    DailyScore = apps.get_model("api", "DailyScore")
+
+    daily_scores = (
+        ScoreHistory.objects.annotate(day=TruncDate("date"))
+        .values("user", "day", "game_name")
+        .annotate(points=Sum("score_gained"), sessions=Count("id"))
+    )
+    entries = [
+        DailyScore(
+            user_id=row["user"],
+            day=row["day"],
+            game_name=row["game_name"],
+            points=row["points"],
+            sessions=row["sessions"],
+        )
+        for row in daily_scores
+    ]
+    DailyScore.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0030_dailyscore"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_daily_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0032_weeklyscoreboardsnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserActivityDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("memory", models.PositiveIntegerField(default=0)),
+                ("falling_words", models.PositiveIntegerField(default=0)),
+                ("finding_words", models.PositiveIntegerField(default=0)),
+                ("race", models.PositiveIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="activity_days",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("user", "day")},
+            },
+        ),
+    ]
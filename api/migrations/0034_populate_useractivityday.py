@@ -0,0 +1,44 @@
+# Generated by Django 4.2.1 on 2026-10-18 05:40
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+SESSION_MODELS = {
+    "memory": "MemoryGameSession",
+    "falling_words": "FallingWordsGameSession",
+    "finding_words": "FindingWordsGameSession",
+    "race": "RaceGameSession",
+}
+
+
+def populate_activity_days(apps, schema_editor):
+    UserActivityDay = apps.get_model("api", "UserActivityDay")
+
+    activity_days = {}
+    for game_name, model_name in SESSION_MODELS.items():
+        session_model = apps.get_model("api", model_name)
+        sessions_per_day = (
+            session_model.objects.annotate(day=TruncDate("timestamp"))
+            .values("user", "day")
+            .annotate(sessions=Count("id"))
+        )
+        for row in sessions_per_day:
+            activity_day = activity_days.setdefault(
+                (row["user"], row["day"]),
+                UserActivityDay(user_id=row["user"], day=row["day"]),
+            )
+            setattr(activity_day, game_name, row["sessions"])
+
+    UserActivityDay.objects.bulk_create(activity_days.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0033_useractivityday"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_activity_days, migrations.RunPython.noop),
+    ]
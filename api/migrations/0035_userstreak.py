@@ -0,0 +1,36 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0034_populate_useractivityday"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStreak",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="streak",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("current_streak", models.PositiveIntegerField(default=0)),
+                ("current_streak_start", models.DateField(null=True)),
+                ("longest_streak", models.PositiveIntegerField(default=0)),
+                ("longest_streak_start", models.DateField(null=True)),
+                ("longest_streak_end", models.DateField(null=True)),
+                ("last_active_day", models.DateField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:09
+
+from itertools import groupby
+
+from django.db import migrations
+
+
+def populate_streaks(apps, schema_editor):
+    """
+    Builds the stored streak of every user from the activity days.
+    """
+    UserActivityDay = apps.get_model("api", "UserActivityDay")
+    UserStreak = apps.get_model("api", "UserStreak")
+
+    streaks = []
+    activity_days = UserActivityDay.objects.order_by("user", "day").values_list("user", "day").iterator()
+    for user_id, rows in groupby(activity_days, key=lambda row: row[0]):
+        streak = UserStreak(user_id=user_id)
+        for _, day in rows:
+            if streak.last_active_day is not None and (day - streak.last_active_day).days == 1:
+                streak.current_streak += 1
+            else:
+                streak.current_streak = 1
+                streak.current_streak_start = day
+            streak.last_active_day = day
+
+            if streak.current_streak > streak.longest_streak:
+                streak.longest_streak = streak.current_streak
+                streak.longest_streak_start = streak.current_streak_start
+                streak.longest_streak_end = day
+        streaks.append(streak)
+
+    UserStreak.objects.bulk_create(streaks, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0035_userstreak"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_streaks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:14
+
+from django.db import migrations
+from django.db.models import Sum
+
+UNLOCK_WORDSET_THRESHOLD = 1000
+SESSION_MODELS = [
+    "MemoryGameSession",
+    "FallingWordsGameSession",
+    "FindingWordsGameSession",
+    "RaceGameSession",
+]
+
+
+def populate_wordset_progress(apps, schema_editor):
+    WordSetProgress = apps.get_model("api", "WordSetProgress")
+
+    points = {}
+    for model_name in SESSION_MODELS:
+        session_model = apps.get_model("api", model_name)
+        for row in session_model.objects.values("user", "wordset").annotate(points=Sum("score")):
+            key = (row["user"], row["wordset"])
+            points[key] = points.get(key, 0) + row["points"]
+
+    progress = [
+        WordSetProgress(
+            user_id=user_id,
+            wordset_id=wordset_id,
+            points=wordset_points,
+            unlocked=wordset_points >= UNLOCK_WORDSET_THRESHOLD,
+        )
+        for (user_id, wordset_id), wordset_points in points.items()
+    ]
+    WordSetProgress.objects.bulk_create(progress, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0038_wordsetprogress"),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_wordset_progress, migrations.RunPython.noop),
+    ]
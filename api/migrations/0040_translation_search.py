@@ -0,0 +1,53 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:18
+
+import api.search
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0039_populate_wordsetprogress"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE FUNCTION api_fold_diacritics(text) RETURNS text
+                LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+                AS $$ SELECT lower(translate($1, 'ąćęłńóśźżĄĆĘŁŃÓŚŹŻ', 'acelnoszzACELNOSZZ')) $$;
+            """,
+            reverse_sql="DROP FUNCTION api_fold_diacritics(text);",
+        ),
+        migrations.AddIndex(
+            model_name="translation",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.SearchVector(
+                    api.search.FoldDiacritics("english"),
+                    api.search.FoldDiacritics("polish"),
+                    config="simple",
+                ),
+                name="translation_search_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="translation",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    api.search.FoldDiacritics("english"), name="text_pattern_ops"
+                ),
+                name="translation_english_prefix_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="translation",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    api.search.FoldDiacritics("polish"), name="text_pattern_ops"
+                ),
+                name="translation_polish_prefix_idx",
+            ),
+        ),
+    ]
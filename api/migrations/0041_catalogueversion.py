@@ -0,0 +1,33 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:47
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    apps.get_model("api", "CatalogueVersion").objects.create()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0040_translation_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogueVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
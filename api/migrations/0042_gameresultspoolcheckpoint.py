@@ -0,0 +1,29 @@
+# Generated by Django 4.2.1 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0041_catalogueversion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GameResultSpoolCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=32, unique=True)),
+                ("last_sequence", models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.1 on 2026-10-18 05:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0042_gameresultspoolcheckpoint"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="scorehistory",
+            name="date",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+from api.partitions import partition_table, unpartition_table
+
+MONTHS_AHEAD = 3
+# Game sessions are partitioned once they share a single table
+PARTITIONED_TABLES = {
+    "api_scorehistory": "date",
+}
+
+
+def partition_tables(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for table, column in PARTITIONED_TABLES.items():
+            partition_table(cursor, table, column, MONTHS_AHEAD)
+
+
+def unpartition_tables(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            unpartition_table(cursor, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0043_scorehistory_date_default"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
@@ -0,0 +1,250 @@
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+from api.partitions import partition_table, unpartition_table
+
+MONTHS_AHEAD = 3
+# Game name, table and opponents table (with its session column) of the replaced session models
+GAME_SESSION_TABLES = [
+    ("memory", "api_memorygamesession", None),
+    ("falling_words", "api_fallingwordsgamesession", None),
+    ("race", "api_racegamesession", ("api_racegamesession_opponents", "racegamesession_id")),
+    ("finding_words", "api_findingwordsgamesession",
+     ("api_findingwordsgamesession_opponents", "findingwordsgamesession_id")),
+]
+SESSION_COLUMNS = "user_id, wordset_id, score, duration, timestamp"
+
+
+def partition_game_sessions(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        partition_table(cursor, "api_gamesession", "timestamp", MONTHS_AHEAD)
+
+
+def unpartition_game_sessions(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        unpartition_table(cursor, "api_gamesession")
+
+
+def copy_game_sessions(apps, schema_editor):
+    """
+    Copies sessions of all games into the shared table. Ids of the games
+    overlap, so sessions are numbered anew in order of their timestamps.
+    """
+    sessions = " UNION ALL ".join(f"SELECT '{game_name}' AS game_name, id, timestamp FROM {table}"
+                                  for game_name, table, _ in GAME_SESSION_TABLES)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE game_session_ids AS "
+            f"SELECT sessions.game_name, sessions.id AS old_id, "
+            f"nextval(pg_get_serial_sequence('api_gamesession', 'id')) AS new_id "
+            f"FROM ({sessions} ORDER BY timestamp, game_name, id) sessions"
+        )
+        for game_name, table, opponents in GAME_SESSION_TABLES:
+            cursor.execute(
+                f"INSERT INTO api_gamesession (id, game_name, {SESSION_COLUMNS}) "
+                f"SELECT ids.new_id, ids.game_name, {', '.join(f'old.{column}' for column in SESSION_COLUMNS.split(', '))} "
+                f"FROM {table} old JOIN game_session_ids ids ON ids.game_name = %s AND ids.old_id = old.id",
+                [game_name],
+            )
+            if opponents:
+                opponents_table, session_column = opponents
+                cursor.execute(
+                    f"INSERT INTO api_gamesessionopponent (session_id, user_id) "
+                    f"SELECT ids.new_id, opponents.customuser_id FROM {opponents_table} opponents "
+                    f"JOIN game_session_ids ids ON ids.game_name = %s AND ids.old_id = opponents.{session_column}",
+                    [game_name],
+                )
+        cursor.execute("DROP TABLE game_session_ids")
+
+
+def copy_game_sessions_back(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for game_name, table, opponents in GAME_SESSION_TABLES:
+            cursor.execute(
+                f"INSERT INTO {table} (id, game_name, {SESSION_COLUMNS}) "
+                f"SELECT id, game_name, {SESSION_COLUMNS} FROM api_gamesession WHERE game_name = %s",
+                [game_name],
+            )
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) "
+                f"FROM {table}"
+            )
+            if opponents:
+                opponents_table, session_column = opponents
+                cursor.execute(
+                    f"INSERT INTO {opponents_table} ({session_column}, customuser_id) "
+                    f"SELECT opponents.session_id, opponents.user_id FROM api_gamesessionopponent opponents "
+                    f"JOIN api_gamesession sessions ON sessions.id = opponents.session_id AND sessions.game_name = %s",
+                    [game_name],
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0044_partition_game_history"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GameSession",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "score",
+                    models.IntegerField(
+                        validators=[django.core.validators.MinValueValidator(0)]
+                    ),
+                ),
+                (
+                    "duration",
+                    models.IntegerField(
+                        default=0,
+                        validators=[django.core.validators.MinValueValidator(0)],
+                    ),
+                ),
+                ("timestamp", models.DateTimeField()),
+                (
+                    "game_name",
+                    models.CharField(
+                        choices=[
+                            ("memory", "Memory"),
+                            ("falling_words", "Falling Words"),
+                            ("finding_words", "Finding Words"),
+                            ("race", "Race"),
+                        ],
+                        default="memory",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "wordset",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.DO_NOTHING, to="api.wordset"
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["user", "timestamp"], name="gamesession_user_time_idx"),
+                    models.Index(fields=["user", "wordset"], name="gamesession_user_wordset_idx"),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="GameSessionOpponent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="opponent_entries",
+                        to="api.gamesession",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("session", "user")},
+            },
+        ),
+        migrations.AddField(
+            model_name="gamesession",
+            name="opponents",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="opponent_game_sessions",
+                through="api.GameSessionOpponent",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(copy_game_sessions, copy_game_sessions_back),
+        migrations.RunPython(partition_game_sessions, unpartition_game_sessions),
+        migrations.DeleteModel(
+            name="FallingWordsGameSession",
+        ),
+        migrations.DeleteModel(
+            name="FindingWordsGameSession",
+        ),
+        migrations.DeleteModel(
+            name="MemoryGameSession",
+        ),
+        migrations.DeleteModel(
+            name="RaceGameSession",
+        ),
+        migrations.CreateModel(
+            name="FallingWordsGameSession",
+            fields=[],
+            options={
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("api.gamesession",),
+        ),
+        migrations.CreateModel(
+            name="FindingWordsGameSession",
+            fields=[],
+            options={
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("api.gamesession",),
+        ),
+        migrations.CreateModel(
+            name="MemoryGameSession",
+            fields=[],
+            options={
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("api.gamesession",),
+        ),
+        migrations.CreateModel(
+            name="RaceGameSession",
+            fields=[],
+            options={
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("api.gamesession",),
+        ),
+    ]
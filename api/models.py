@@ -1,13 +1,19 @@
+from collections import Counter
 from dataclasses import asdict, dataclass
+from datetime import date
 import json
 from typing import List
-from django.db import models, transaction
+from django.db import connection, models, transaction
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth.models import AbstractUser
-from django.db.models import F
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from api.catalogue import get_translation_catalogue
 from api.consumers.helpers import FindingWordsRound, get_finding_words_rounds, get_race_rounds, get_words_for_play
 from api.consumers.updates_consumer import send_waitroom_invitations_cancelation
-from api.helpers import get_score_goal_for_level
+from api.search import FoldDiacritics, get_translation_search_vector
+from api.helpers import calculate_week_start, get_level_for_score, get_score_goal_for_level
 from backend import settings
 
 
@@ -19,13 +25,32 @@ class Translation(models.Model):
     polish = models.CharField(max_length=64)
     starred_by = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='favorite_translations', blank=True)
 
+    class Meta:
+        indexes = [
+            GinIndex(get_translation_search_vector(), name='translation_search_idx'),
+            models.Index(OpClass(FoldDiacritics('english'), name='text_pattern_ops'),
+                         name='translation_english_prefix_idx'),
+            models.Index(OpClass(FoldDiacritics('polish'), name='text_pattern_ops'),
+                         name='translation_polish_prefix_idx'),
+        ]
+
     def __str__(self) -> str:
         return self.english
 
     def get_starred_by_user(self, user):
-        self.refresh_from_db()
         return self.starred_by.filter(id=user.id).exists()
 
+    @classmethod
+    def with_star_for_user(cls, user, queryset=None):
+        """
+        Annotates translations with `star`, whether the user starred them,
+        computed with a single EXISTS subquery instead of a query per row.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        stars = cls.starred_by.through.objects.filter(translation=OuterRef("pk"), customuser=user)
+        return queryset.annotate(star=Exists(stars))
+
 
 class WordSetCategory(models.TextChoices):
     FOOD = "food", "Food"
@@ -51,29 +76,175 @@ class WordSet(models.Model):
         return list(wordsets)
 
     def get_total_points_for_user(self, user):
-        total_points = 0
-        for game_name, session_model in GAME_NAMES_MODELS_MAPPING.items():
-            game_sessions = session_model.objects.filter(user=user, wordset=self)
-            for session in game_sessions:
-                total_points += session.score
-
-        return total_points
+        points = WordSetProgress.objects.filter(user=user, wordset=self).values_list("points", flat=True).first()
+        return points or 0
 
     def is_locked_for_user(self, user):
-        easier_wordsets = list(self.get_easier_wordsets_from_category())
-        for wordset in easier_wordsets:
-            if wordset.get_total_points_for_user(user) < UNLOCK_WORDSET_THRESHOLD:
-                return True
-        return False
+        return WordSet.objects.filter(
+            category=self.category,
+            difficulty__lt=self.difficulty,
+        ).filter(~Exists(WordSetProgress.objects.filter(user=user, wordset=OuterRef("pk"), unlocked=True))).exists()
+
+
+class CatalogueVersion(models.Model):
+    """
+    Version of the wordsets and their translations, shared by all processes
+    (see `api.catalogue`). A single row, bumped by the transactions changing
+    the catalogue.
+    """
+    version = models.BigIntegerField(default=0)
 
 
 class ScoreHistory(models.Model):
     user = models.ForeignKey("CustomUser", on_delete=models.CASCADE)
-    date = models.DateTimeField(auto_now_add=True)
+    date = models.DateTimeField(default=timezone.now)
     game_name = models.CharField(max_length=20, default="")
     score_gained = models.PositiveIntegerField()
 
 
+class LeaderboardPeriod(models.TextChoices):
+    ALL_TIME = "all_time", "All time"
+    WEEK = "week", "Week"
+
+
+# All-time entries live in a single bucket, so they share one fixed start date
+ALL_TIME_PERIOD_START = date(1970, 1, 1)
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Points of a user in one scoreboard bucket (all time or a single week).
+    Kept up to date by `GameSession.record_results`, so scoreboards can be read
+    with an indexed ORDER BY instead of aggregating `ScoreHistory`.
+    """
+    user = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="leaderboard_entries")
+    period = models.CharField(max_length=16, choices=LeaderboardPeriod.choices)
+    period_start = models.DateField()
+    points = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'period', 'period_start']
+        indexes = [
+            models.Index(fields=['period', 'period_start', '-points'], name='leaderboard_ranking_idx'),
+        ]
+
+    @classmethod
+    def add_points(cls, user, points, week_start):
+        for period, period_start in ((LeaderboardPeriod.ALL_TIME, ALL_TIME_PERIOD_START),
+                                     (LeaderboardPeriod.WEEK, week_start)):
+            with transaction.atomic():
+                entry, created = cls.objects.select_for_update().get_or_create(
+                    user=user, period=period, period_start=period_start)
+                previous_points = None if created else entry.points
+                cls.objects.filter(pk=entry.pk).update(points=F('points') + points)
+                LeaderboardRankIndex.move(period, period_start, previous_points, entry.points + points)
+
+
+class LeaderboardRankIndex(models.Model):
+    """
+    Distinct point values of a scoreboard bucket with the number of users
+    holding them. Places are dense, so the place of a score is the number of
+    distinct higher scores plus one, which is a count over this (small) table
+    instead of a ranking of every `LeaderboardEntry`.
+    """
+    period = models.CharField(max_length=16, choices=LeaderboardPeriod.choices)
+    period_start = models.DateField()
+    points = models.PositiveIntegerField()
+    users_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['period', 'period_start', 'points']
+
+    @classmethod
+    def move(cls, period, period_start, previous_points, points):
+        """
+        Moves a user from the `previous_points` bucket (None for a new user)
+        to the `points` one. Both steps are single statements, so concurrent
+        moves can't lose a bucket. Emptied buckets stay with a zero count.
+        """
+        if previous_points == points:
+            return
+
+        if previous_points is not None:
+            cls.objects.filter(period=period, period_start=period_start, points=previous_points,
+                               users_count__gt=0).update(users_count=F('users_count') - 1)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {cls._meta.db_table} (period, period_start, points, users_count) VALUES (%s, %s, %s, 1) "
+                f"ON CONFLICT (period, period_start, points) "
+                f"DO UPDATE SET users_count = {cls._meta.db_table}.users_count + 1",
+                [period, period_start, points],
+            )
+
+
+class WeeklyScoreboardSnapshot(models.Model):
+    """
+    Frozen scoreboard of a finished week: its ranked top places and the
+    place of every user that scored during that week (`places`).
+    """
+    week_start = models.DateField(unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    top_places = models.JSONField(default=list)
+    last_place = models.PositiveIntegerField(default=0)
+
+
+class WeeklyScoreboardPlace(models.Model):
+    snapshot = models.ForeignKey(WeeklyScoreboardSnapshot, on_delete=models.CASCADE, related_name="places")
+    user = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="weekly_places")
+    place = models.PositiveIntegerField()
+    points = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ['snapshot', 'user']
+
+
+class DailyScore(models.Model):
+    """
+    Daily rollup of `ScoreHistory`: points and number of finished games of
+    a user in one game on one day.
+    """
+    user = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="daily_scores")
+    day = models.DateField()
+    game_name = models.CharField(max_length=20)
+    points = models.PositiveIntegerField(default=0)
+    sessions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'day', 'game_name']
+        indexes = [
+            models.Index(fields=['day', 'game_name'], name='dailyscore_day_game_idx'),
+        ]
+
+    @classmethod
+    def add(cls, user, day, game_name, points, sessions=1):
+        daily_score, _ = cls.objects.get_or_create(user=user, day=day, game_name=game_name)
+        cls.objects.filter(pk=daily_score.pk).update(points=F('points') + points, sessions=F('sessions') + sessions)
+
+
+class WordSetProgress(models.Model):
+    """
+    Points a user scored in a wordset over all games. The wordset is marked
+    `unlocked` once the points reach `UNLOCK_WORDSET_THRESHOLD`, which unlocks
+    the harder wordsets of its category.
+    """
+    user = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="wordset_progress")
+    wordset = models.ForeignKey(WordSet, on_delete=models.CASCADE, related_name="progress")
+    points = models.PositiveIntegerField(default=0)
+    unlocked = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ['user', 'wordset']
+
+    @classmethod
+    def add_points(cls, user, wordset, points):
+        progress, _ = cls.objects.get_or_create(user=user, wordset=wordset)
+        cls.objects.filter(pk=progress.pk).update(
+            points=F('points') + points,
+            unlocked=Q(unlocked=True) | Q(points__gte=UNLOCK_WORDSET_THRESHOLD - points),
+        )
+
+
 class CustomUser(AbstractUser):
     score = models.PositiveIntegerField(default=0)
     level = models.PositiveIntegerField(blank=False, default=1)
@@ -81,24 +252,144 @@ class CustomUser(AbstractUser):
     llama = models.PositiveIntegerField(default=0, validators=[MinValueValidator(0), MaxValueValidator(10)])
 
     def calculate_level(self):
-        if self.score >= get_score_goal_for_level(self.level + 1):
-            self.level = self.level + 1
+        self.level = max(self.level, get_level_for_score(self.score))
         self.save()
 
     def get_points_to_next_level(self):
         return get_score_goal_for_level(self.level + 1) - self.score
 
     def add_score(self, score, game_name):
+        """
+        Adds the score and appends it to the score history in a single
+        statement. The score is incremented in the database, so concurrent
+        games don't lose updates, and the level is set in closed form from
+        the new score, however many levels it crosses. Returns the history row.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(ADD_SCORE_SQL.format(
+                user_table=connection.ops.quote_name(CustomUser._meta.db_table),
+                history_table=connection.ops.quote_name(ScoreHistory._meta.db_table),
+            ), {"user_id": self.pk, "score": score, "game_name": game_name, "date": timezone.now()})
+            row = cursor.fetchone()
+        if row is None:
+            # Deleted meanwhile, nothing was written
+            raise CustomUser.DoesNotExist(f"User {self.pk} does not exist.")
+        self.score, self.level, history_id, history_date = row
+
+        print(f"User {self.username} gained {score} points in {game_name} game")
+        return ScoreHistory(id=history_id, user=self, date=history_date, game_name=game_name, score_gained=score)
+
+
+# Level is floor(log2(score / 300)), see `get_level_for_score`
+ADD_SCORE_SQL = """
+    WITH ledger AS (
+        UPDATE {user_table}
+        SET score = score + %(score)s,
+            level = GREATEST(level, 1, FLOOR(LOG(2, GREATEST((score + %(score)s) / 300, 1)::numeric))::integer)
+        WHERE id = %(user_id)s
+        RETURNING score, level
+    ), history AS (
+        INSERT INTO {history_table} (user_id, date, game_name, score_gained)
+        SELECT %(user_id)s, %(date)s, %(game_name)s, %(score)s FROM ledger
+        RETURNING id, date
+    )
+    SELECT ledger.score, ledger.level, history.id, history.date FROM ledger, history
+"""
+
+
+class UserActivityDay(models.Model):
+    """
+    Number of game sessions a user played on a single day, per game.
+    Columns are named after the games, see `GameSession.GAME_CHOICES`.
+    """
+    user = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="activity_days")
+    day = models.DateField()
+    memory = models.PositiveIntegerField(default=0)
+    falling_words = models.PositiveIntegerField(default=0)
+    finding_words = models.PositiveIntegerField(default=0)
+    race = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'day']
+
+    @classmethod
+    def add_session(cls, user, day, game_name, count=1):
+        activity_day, _ = cls.objects.get_or_create(user=user, day=day)
+        cls.objects.filter(pk=activity_day.pk).update(**{game_name: F(game_name) + count})
+
+
+class UserStreak(models.Model):
+    """
+    Streaks of consecutive activity days of a user across all games, updated
+    in constant time whenever the user plays on a new day.
+    """
+    user = models.OneToOneField("CustomUser", on_delete=models.CASCADE, primary_key=True, related_name="streak")
+    current_streak = models.PositiveIntegerField(default=0)
+    current_streak_start = models.DateField(null=True)
+    longest_streak = models.PositiveIntegerField(default=0)
+    longest_streak_start = models.DateField(null=True)
+    longest_streak_end = models.DateField(null=True)
+    last_active_day = models.DateField(null=True)
+
+    @classmethod
+    def record_activity(cls, user, day):
         with transaction.atomic():
-            self.score = self.score + score
-            self.save()
-            self.calculate_level()
-            print(f"User {self.username} gained {score} points in {game_name} game")
-            ScoreHistory.objects.create(user=self, score_gained=score, game_name=game_name)
+            streak, _ = cls.objects.select_for_update().get_or_create(user=user)
+            if streak.add_active_day(day):
+                streak.save()
+
+    def add_active_day(self, day):
+        # Days older than the last active one can't change the streaks
+        if self.last_active_day is not None and day <= self.last_active_day:
+            return False
+
+        if self.last_active_day is not None and (day - self.last_active_day).days == 1:
+            self.current_streak += 1
+        else:
+            self.current_streak = 1
+            self.current_streak_start = day
+        self.last_active_day = day
+
+        if self.current_streak > self.longest_streak:
+            self.longest_streak = self.current_streak
+            self.longest_streak_start = self.current_streak_start
+            self.longest_streak_end = day
+        return True
+
+    def get_current_streak(self, today):
+        return self.current_streak if self.last_active_day == today else 0
+
+
+class UserStatisticsVersion(models.Model):
+    """
+    Version of a user's statistics, bumped whenever they change, see
+    `api.statistics.cached_statistics`. It is kept out of the user row,
+    which profile updates save as a whole.
+    """
+    user = models.OneToOneField("CustomUser", on_delete=models.CASCADE, primary_key=True, related_name="+")
+    version = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def get_version(cls, user):
+        return cls.objects.filter(user=user).values_list("version", flat=True).first() or 0
+
+    @classmethod
+    def bump(cls, user):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {cls._meta.db_table} (user_id, version) VALUES (%s, 1) "
+                f"ON CONFLICT (user_id) DO UPDATE SET version = {cls._meta.db_table}.version + 1",
+                [user.pk],
+            )
 
 
 # Game Sessions
-class BaseGameSession(models.Model):
+class GameSession(models.Model):
+    """
+    Finished game of a user. Sessions of all games share this table and are
+    told apart by `game_name`, so reads across games are a single query.
+    The per-game proxy models below only see sessions of their game.
+    """
     GAME_CHOICES = [
         ('memory', 'Memory'),
         ('falling_words', 'Falling Words'),
@@ -106,58 +397,134 @@ class BaseGameSession(models.Model):
         ('race', 'Race'),
     ]
 
-    user = models.ForeignKey("CustomUser", on_delete=models.DO_NOTHING, null=False)
+    # Covered by the (user, timestamp) index
+    user = models.ForeignKey("CustomUser", on_delete=models.DO_NOTHING, null=False, db_index=False)
     wordset = models.ForeignKey(WordSet, on_delete=models.DO_NOTHING, null=False)
     score = models.IntegerField(validators=[MinValueValidator(0)])
     duration = models.IntegerField(validators=[MinValueValidator(0)], default=0)  # in seconds
     timestamp = models.DateTimeField(auto_now_add=False)
     game_name = models.CharField(max_length=20, choices=GAME_CHOICES, default='memory')
+    opponents = models.ManyToManyField("CustomUser", through="GameSessionOpponent",
+                                       related_name="opponent_game_sessions", blank=True)
 
     class Meta:
-        abstract = True
+        indexes = [
+            models.Index(fields=['user', 'timestamp'], name='gamesession_user_time_idx'),
+            models.Index(fields=['user', 'wordset'], name='gamesession_user_wordset_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        self.user.add_score(self.score, self.game_name)
-        self.timestamp = self.user.scorehistory_set.last().date
-        super(BaseGameSession, self).save(*args, **kwargs)
+        # Multiplayer consumers save a session again after setting its opponents,
+        # the score must only be granted once
+        adding = self._state.adding
+        with transaction.atomic():
+            if adding:
+                self.timestamp = self.user.add_score(self.score, self.game_name).date
+            super(GameSession, self).save(*args, **kwargs)
+            if adding:
+                GameSession.record_results(self.user, [self])
+
+    @classmethod
+    def record_results(cls, user, sessions):
+        """
+        Adds newly saved sessions of the user, whose score is already added,
+        to the scoreboards, daily scores, activity days, streak and wordset
+        progress, and invalidates the user's statistics. Sessions are summed
+        per week, day, game and wordset, so a batch costs one update per
+        affected row. Sessions count in the week they were played in.
+        """
+        weekly_points, daily_points, daily_sessions, wordset_points = Counter(), Counter(), Counter(), Counter()
+        wordsets = {}
+        for session in sessions:
+            day = timezone.localdate(session.timestamp)
+            weekly_points[calculate_week_start(session.timestamp)] += session.score
+            daily_points[day, session.game_name] += session.score
+            daily_sessions[day, session.game_name] += 1
+            wordset_points[session.wordset_id] += session.score
+            wordsets[session.wordset_id] = session.wordset
+
+        for week_start, points in weekly_points.items():
+            LeaderboardEntry.add_points(user, points, week_start)
+        for (day, game_name), count in daily_sessions.items():
+            DailyScore.add(user, day, game_name, daily_points[day, game_name], count)
+            UserActivityDay.add_session(user, day, game_name, count)
+        for day in sorted({day for day, _ in daily_sessions}):
+            UserStreak.record_activity(user, day)
+        for wordset_id, points in wordset_points.items():
+            WordSetProgress.add_points(user, wordsets[wordset_id], points)
+        UserStatisticsVersion.bump(user)
+
+
+class GameSessionOpponent(models.Model):
+    """
+    Other players of a multiplayer game session. The session table is
+    partitioned by timestamp (see `api.partitions`), so the session can't be
+    referenced by a database constraint, deletes cascade through Django.
+    """
+    session = models.ForeignKey(GameSession, on_delete=models.CASCADE, db_constraint=False,
+                                related_name="opponent_entries")
+    user = models.ForeignKey("CustomUser", on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        unique_together = ['session', 'user']
 
 
-class MemoryGameSession(BaseGameSession):
+class GameSessionManager(models.Manager):
+    """
+    Manager of a per-game proxy model, limited to sessions of its game.
+    """
+
+    def __init__(self, game_name):
+        super().__init__()
+        self.game_name = game_name
+
+    def get_queryset(self):
+        return super().get_queryset().filter(game_name=self.game_name)
+
+
+class MemoryGameSession(GameSession):
+    objects = GameSessionManager('memory')
+
+    class Meta:
+        proxy = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.game_name = 'memory'
 
-    def save(self, *args, **kwargs):
-        super(MemoryGameSession, self).save(*args, **kwargs)
 
+class FallingWordsGameSession(GameSession):
+    objects = GameSessionManager('falling_words')
+
+    class Meta:
+        proxy = True
 
-class FallingWordsGameSession(BaseGameSession):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.game_name = 'falling_words'
 
-    def save(self, *args, **kwargs):
-        super(FallingWordsGameSession, self).save(*args, **kwargs)
 
+class RaceGameSession(GameSession):
+    objects = GameSessionManager('race')
 
-class RaceGameSession(BaseGameSession):
-    opponents = models.ManyToManyField("CustomUser", related_name="race_game_sessions", blank=True)
+    class Meta:
+        proxy = True
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.game_name = 'race'
 
 
-class FindingWordsGameSession(BaseGameSession):
-    opponents = models.ManyToManyField("CustomUser", related_name="finding_words_game_sessions", blank=True)
+class FindingWordsGameSession(GameSession):
+    objects = GameSessionManager('finding_words')
+
+    class Meta:
+        proxy = True
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.game_name = 'finding_words'
 
-    def save(self, *args, **kwargs):
-        super(FindingWordsGameSession, self).save(*args, **kwargs)
-
 
 GAME_NAMES_MODELS_MAPPING = {
     "finding_words": FindingWordsGameSession,
@@ -168,6 +535,15 @@ GAME_NAMES_MODELS_MAPPING = {
 }
 
 
+class GameResultSpoolCheckpoint(models.Model):
+    """
+    Sequence number of the last spooled game result written to the database
+    by the write-behind writer (see `api.write_behind`).
+    """
+    name = models.CharField(max_length=32, unique=True)
+    last_sequence = models.BigIntegerField(default=0)
+
+
 class MultiplayerGames(models.TextChoices):
     RACE = "race"
     FINDING_WORDS = "findingwords"
@@ -283,7 +659,7 @@ class FindingWordsActiveGame(ActiveMultiplayerGame):
         round: FindingWordsRound = json.loads(self.rounds)[round]
 
         valid_answer = answer and all([letter in round["letters"] for letter in answer])
-        correct_answer = self.wordset.words.all().filter(english=answer).values("id").first()
+        correct_answer = get_translation_catalogue().get_wordset(self.wordset_id).has_english(answer)
         return valid_answer and correct_answer
 
 class FriendRequest(models.Model):
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    """
+    Cursor pagination that clients opt into with `?page_size=`. Without it
+    the whole list is returned as before.
+    """
+    page_size = None
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = "id"
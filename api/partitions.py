@@ -0,0 +1,208 @@
+import re
+from datetime import datetime, timezone
+
+from django.db import connection
+
+# Tables split into monthly range partitions, with their partition column.
+# The primary key of a partitioned table has to include the partition column,
+# so no foreign key constraint can point at them.
+PARTITIONED_TABLES = {
+    "api_scorehistory": "date",
+    "api_gamesession": "timestamp",
+}
+
+# Tables whose rows belong to rows of a partitioned table, with the column
+# holding the id. They are archived and deleted along with the partitions.
+PARTITION_DEPENDENT_TABLES = {
+    "api_gamesession": {"api_gamesessionopponent": "session_id"},
+}
+
+_BOUNDS_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def get_month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month, months):
+    month_index = month.year * 12 + month.month - 1 + months
+    return datetime(month_index // 12, month_index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def get_partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def get_default_partition_name(table):
+    return f"{table}_default"
+
+
+def get_partitions(cursor, table):
+    """
+    Returns (name, month) of the monthly partitions of the table, oldest first.
+    """
+    cursor.execute(
+        "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid WHERE pg_inherits.inhparent = %s::regclass",
+        [table],
+    )
+    partitions = []
+    for name, bounds in cursor.fetchall():
+        match = _BOUNDS_RE.search(bounds)
+        if match:
+            partitions.append((name, datetime.fromisoformat(match[1]).astimezone(timezone.utc)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass", [table])
+    return cursor.fetchone()[0]
+
+
+def create_month_partition(cursor, table, column, month):
+    """
+    Creates the partition of the month unless it exists. Rows of the month
+    that ended up in the default partition are moved into it.
+    """
+    name = get_partition_name(table, month)
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [name])
+    if cursor.fetchone()[0]:
+        return False
+
+    qn = connection.ops.quote_name
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {qn(get_default_partition_name(table))} "
+        f"WHERE {qn(column)} >= %s AND {qn(column)} < %s RETURNING *) "
+        f"INSERT INTO {qn(name)} SELECT * FROM moved",
+        [start, end],
+    )
+    cursor.execute(f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM ('{start}') TO ('{end}')")
+    return True
+
+
+def get_default_partition_months(cursor, table, column):
+    """
+    Months of the rows stored in the default partition, i.e. months without
+    a partition of their own.
+    """
+    qn = connection.ops.quote_name
+    cursor.execute(
+        f"SELECT DISTINCT date_trunc('month', {qn(column)}, 'UTC') FROM {qn(get_default_partition_name(table))}"
+    )
+    return sorted(get_month_start(month.astimezone(timezone.utc)) for month, in cursor.fetchall())
+
+
+def _get_indexes_and_foreign_keys(cursor, table):
+    cursor.execute("SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s::regclass "
+                   "AND NOT indisprimary", [table])
+    indexes = [definition for definition, in cursor.fetchall()]
+    cursor.execute("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass "
+                   "AND contype = 'f'", [table])
+    return indexes, cursor.fetchall()
+
+
+def _restore_indexes_and_foreign_keys(cursor, table, indexes, foreign_keys):
+    qn = connection.ops.quote_name
+    for definition in indexes:
+        cursor.execute(definition)
+    for name, definition in foreign_keys:
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+
+
+def partition_table(cursor, table, column, months_ahead):
+    """
+    Rebuilds a plain table as a table partitioned by month of the column,
+    with a partition for every month from the oldest row to `months_ahead`
+    months from now and a default partition. The primary key becomes
+    (id, column), ids keep coming from a sequence continuing the old one.
+    Indexes and foreign keys are recreated with their names.
+    """
+    if is_partitioned(cursor, table):
+        return
+
+    qn = connection.ops.quote_name
+    old_table, sequence = f"{table}_unpartitioned", f"{table}_id_seq"
+    indexes, foreign_keys = _get_indexes_and_foreign_keys(cursor, table)
+    cursor.execute(f"SELECT MIN({qn(column)}), MAX(id) FROM {qn(table)}")
+    oldest, last_id = cursor.fetchone()
+
+    cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id DROP IDENTITY")
+    cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old_table)}")
+    cursor.execute(f"CREATE TABLE {qn(table)} (LIKE {qn(old_table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+                   f"PARTITION BY RANGE ({qn(column)})")
+    cursor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id")
+    cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+    if last_id is not None:
+        cursor.execute("SELECT setval(%s, %s)", [sequence, last_id])
+
+    cursor.execute(f"CREATE TABLE {qn(get_default_partition_name(table))} PARTITION OF {qn(table)} DEFAULT")
+    this_month = get_month_start(datetime.now(timezone.utc))
+    month = get_month_start(min(oldest, this_month)) if oldest else this_month
+    while month <= add_months(this_month, months_ahead):
+        create_month_partition(cursor, table, column, month)
+        month = add_months(month, 1)
+
+    cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(old_table)}")
+    cursor.execute(f"DROP TABLE {qn(old_table)}")
+    cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_pkey')} PRIMARY KEY (id, {qn(column)})")
+    _restore_indexes_and_foreign_keys(cursor, table, indexes, foreign_keys)
+
+
+def unpartition_table(cursor, table):
+    """
+    Rebuilds a partitioned table as a plain one with an identity id, the
+    reverse of `partition_table`.
+    """
+    if not is_partitioned(cursor, table):
+        return
+
+    qn = connection.ops.quote_name
+    old_table = f"{table}_partitioned"
+    indexes, foreign_keys = _get_indexes_and_foreign_keys(cursor, table)
+    cursor.execute(f"SELECT MAX(id) FROM {qn(table)}")
+    last_id = cursor.fetchone()[0]
+
+    cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old_table)}")
+    cursor.execute(f"CREATE TABLE {qn(table)} (LIKE {qn(old_table)} INCLUDING CONSTRAINTS)")
+    cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(old_table)}")
+    cursor.execute(f"DROP TABLE {qn(old_table)}")
+    cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_pkey')} PRIMARY KEY (id)")
+    cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+    if last_id is not None:
+        cursor.execute("SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)", [table, last_id])
+    _restore_indexes_and_foreign_keys(cursor, table, indexes, foreign_keys)
+
+
+def archive_partition(cursor, table, name, open_archive):
+    """
+    Writes the rows of the partition, and the rows of dependent tables that
+    belong to them, as CSV with a header to binary files opened by
+    `open_archive(archive_name)`, then deletes them and drops the partition.
+    Returns the number of archived partition rows. Writes to the partition
+    are blocked until the transaction ends, so run it in one and only commit
+    once the files are safely stored.
+    """
+    qn = connection.ops.quote_name
+    dependent_tables = PARTITION_DEPENDENT_TABLES.get(table, {})
+    cursor.execute(f"LOCK TABLE {qn(name)} IN SHARE MODE")
+
+    exports = [(name, f"SELECT * FROM {qn(name)}")]
+    exports += [
+        (f"{name}_{dependent_table}",
+         f"SELECT * FROM {qn(dependent_table)} WHERE {qn(column)} IN (SELECT id FROM {qn(name)})")
+        for dependent_table, column in dependent_tables.items()
+    ]
+    archived_rows = []
+    for archive_name, query in exports:
+        with open_archive(archive_name) as file, cursor.copy(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)") as copy:
+            for data in copy:
+                file.write(data)
+        archived_rows.append(cursor.rowcount)
+
+    for dependent_table, column in dependent_tables.items():
+        cursor.execute(f"DELETE FROM {qn(dependent_table)} WHERE {qn(column)} IN (SELECT id FROM {qn(name)})")
+    cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}")
+    cursor.execute(f"DROP TABLE {qn(name)}")
+    return archived_rows[0]
@@ -0,0 +1,128 @@
+from datetime import datetime, time
+
+from django.db import connection
+from django.db.models import F, Sum, Window
+from django.db.models.functions import DenseRank
+from django.utils import timezone
+
+from api.game_sessions import get_game_session_rows
+from api.models import CustomUser, DailyScore, WordSetProgress
+
+
+class RankedScores:
+    """
+    Dense ranking of per-user points computed by PostgreSQL. The scores query
+    yields (user_id, points) rows, the database ranks them with DENSE_RANK
+    and returns only the requested places.
+    """
+
+    def __init__(self, scores_sql, scores_params):
+        self.scores_sql = scores_sql
+        self.scores_params = tuple(scores_params)
+
+    @classmethod
+    def from_queryset(cls, scores, user_ids=None):
+        if user_ids is not None:
+            scores = scores.filter(user_id__in=user_ids)
+        return cls(*scores.values_list("user_id", "points").query.sql_with_params())
+
+    @classmethod
+    def for_game(cls, game_name, since=None, user_ids=None):
+        daily_scores = DailyScore.objects.filter(game_name=game_name)
+        if since:
+            daily_scores = daily_scores.filter(day__gte=since)
+        return cls.from_queryset(daily_scores.values("user_id").annotate(points=Sum("points")), user_ids)
+
+    @classmethod
+    def for_wordset(cls, wordset, since=None, user_ids=None):
+        if not since:
+            return cls.from_queryset(WordSetProgress.objects.filter(wordset=wordset), user_ids)
+
+        # Days start at local midnight
+        filters = {"wordset": wordset, "timestamp__gte": timezone.make_aware(datetime.combine(since, time.min))}
+        if user_ids is not None:
+            filters["user_id__in"] = user_ids
+
+        sessions_sql, sessions_params = get_game_session_rows("all_games", ("user_id", "score"), **filters).as_sql()
+        return cls(
+            f"SELECT sessions.user_id, SUM(sessions.score) FROM ({sessions_sql}) sessions GROUP BY sessions.user_id",
+            sessions_params,
+        )
+
+    def get_places(self, first_place=1, last_place=100):
+        return self._fetch(
+            f"SELECT ranked.place, ranked.username, ranked.points FROM ({self._ranked_sql()}) ranked "
+            f"WHERE ranked.place BETWEEN %s AND %s ORDER BY ranked.position",
+            (first_place, last_place),
+        )
+
+    def get_user_result(self, user):
+        results = self._fetch(
+            f"SELECT ranked.place, ranked.username, ranked.points FROM ({self._ranked_sql()}) ranked "
+            f"WHERE ranked.user_id = %s",
+            (user.pk,),
+        )
+        if results:
+            return results[0]
+
+        # Users without points share the place of ranked users with 0 points, or come after everyone else
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COALESCE(MIN(ranked.place) FILTER (WHERE ranked.points = 0), MAX(ranked.place) + 1, 1) "
+                f"FROM ({self._ranked_sql()}) ranked",
+                self.scores_params,
+            )
+            return {"place": cursor.fetchone()[0], "username": user.username, "points": 0}
+
+    def get_around(self, user, count):
+        results = self._fetch(
+            f"WITH ranked AS ({self._ranked_sql()}) "
+            f"SELECT ranked.place, ranked.username, ranked.points FROM ranked "
+            f"JOIN ranked target ON target.user_id = %s "
+            f"WHERE ranked.position BETWEEN target.position - %s AND target.position + %s "
+            f"ORDER BY ranked.position",
+            (user.pk, count, count),
+        )
+        return results or [self.get_user_result(user)]
+
+    def get_user_places(self):
+        """
+        Returns (user_id, place, points) of every ranked user.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT ranked.user_id, ranked.place, ranked.points FROM ({self._ranked_sql()}) ranked "
+                f"ORDER BY ranked.position",
+                self.scores_params,
+            )
+            return cursor.fetchall()
+
+    def _ranked_sql(self):
+        user_table = connection.ops.quote_name(CustomUser._meta.db_table)
+        return (
+            f"SELECT scores.user_id, users.username, scores.points, "
+            f"DENSE_RANK() OVER (ORDER BY scores.points DESC) AS place, "
+            f"ROW_NUMBER() OVER (ORDER BY scores.points DESC, users.username) AS position "
+            f"FROM ({self.scores_sql}) scores (user_id, points) "
+            f"JOIN {user_table} users ON users.id = scores.user_id"
+        )
+
+    def _fetch(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, self.scores_params + params)
+            return [
+                {"place": place, "username": username, "points": points}
+                for place, username, points in cursor.fetchall()
+            ]
+
+
+def rank_players(players):
+    """
+    Returns usernames and scores of game players ranked by the database.
+    """
+    return list(
+        players
+        .annotate(place=Window(DenseRank(), order_by=F("score").desc()))
+        .order_by("place", "user__username")
+        .values("user__username", "score", "place")
+    )
@@ -0,0 +1,162 @@
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from api.helpers import calculate_current_week_start
+from api.models import ALL_TIME_PERIOD_START, CustomUser, LeaderboardEntry, LeaderboardPeriod, LeaderboardRankIndex, \
+    WeeklyScoreboardPlace, WeeklyScoreboardSnapshot
+from api.ranking import RankedScores
+
+
+class Leaderboard:
+    """
+    Read access to a single scoreboard bucket: the ranked top places,
+    the place of any score and the entries surrounding a user.
+    """
+
+    def __init__(self, period, period_start):
+        self.entries = LeaderboardEntry.objects.filter(period=period, period_start=period_start)
+        self.rank_index_buckets = LeaderboardRankIndex.objects.filter(period=period, period_start=period_start)
+        # Buckets emptied by users moving away are kept for reuse, they hold no place
+        self.rank_index = self.rank_index_buckets.filter(users_count__gt=0)
+
+    @classmethod
+    def for_period(cls, period):
+        """
+        Returns the leaderboard backing the given scoreboard period,
+        or None when the period is unknown.
+        """
+        if period == "all_time":
+            return cls(LeaderboardPeriod.ALL_TIME, ALL_TIME_PERIOD_START)
+        if period == "this_week":
+            return cls(LeaderboardPeriod.WEEK, calculate_current_week_start())
+        return None
+
+    def get_top_places(self, max_place=100):
+        lowest_points = list(self.rank_index.order_by("-points").values_list("points", flat=True)[:max_place])
+        if not lowest_points:
+            return []
+
+        # Entries above the threshold are a prefix of the ranking, so ranking them alone gives the same places
+        return RankedScores.from_queryset(self.entries.filter(points__gte=lowest_points[-1])).get_places(1, max_place)
+
+    def get_scores_for_users(self, user_ids):
+        """
+        Returns points of the given users, including the ones without an entry.
+        """
+        return CustomUser.objects.filter(pk__in=user_ids).annotate(
+            user_id=F("pk"),
+            points=Coalesce(Subquery(self.entries.filter(user=OuterRef("pk")).values("points")[:1]), 0),
+        )
+
+    def get_user_points(self, user):
+        return self.entries.filter(user=user).values_list("points", flat=True).first() or 0
+
+    def get_place(self, points):
+        return self.rank_index.filter(points__gt=points).count() + 1
+
+    def get_user_result(self, user):
+        points = self.get_user_points(user)
+        return {"place": self.get_place(points), "username": user.username, "points": points}
+
+    def get_entries_around(self, user, count):
+        """
+        Returns up to `count` ranked entries above and below the user, together
+        with the user's own entry. Only the point values next to the user's
+        score are read, so the cost doesn't depend on the user's place.
+        """
+        points = self.get_user_points(user)
+        higher_points = list(
+            self.rank_index.filter(points__gt=points).order_by("points").values_list("points", flat=True)[:count]
+        )
+        lower_points = list(
+            self.rank_index.filter(points__lt=points).order_by("-points").values_list("points", flat=True)[:count]
+        )
+
+        scores = self._get_scores(
+            points__lte=higher_points[-1] if higher_points else points,
+            points__gte=lower_points[-1] if lower_points else points,
+        )
+        if not any(score["username"] == user.username for score in scores):
+            # Users that never scored have no entry, they are placed last
+            scores.append({"username": user.username, "points": 0})
+
+        first_place = self.get_place(scores[0]["points"])
+        ranked_scores = rank_scores(scores, first_place)
+        user_index = next(index for index, score in enumerate(ranked_scores) if score["username"] == user.username)
+        return ranked_scores[max(user_index - count, 0):user_index + count + 1]
+
+    def _get_scores(self, **points_range):
+        return [
+            {"username": username, "points": points}
+            for username, points in self.entries
+            .filter(**points_range)
+            .order_by("-points", "user__username")
+            .values_list("user__username", "points")
+        ]
+
+
+def rank_scores(scores, first_place=1):
+    """
+    Assigns places to scores sorted by points (descending). Users with equal
+    points share a place and the next distinct score gets the next place.
+    """
+    ranked_scores = []
+    current_place = first_place
+    previous_score = None
+    for score in scores:
+        if previous_score is not None and score["points"] < previous_score["points"]:
+            current_place += 1
+        ranked_scores.append({"place": current_place, **score})
+        previous_score = score
+    return ranked_scores
+
+
+def get_unarchived_weeks():
+    """
+    Returns starts of finished weeks whose scoreboards weren't archived yet.
+    """
+    return (
+        LeaderboardEntry.objects
+        .filter(period=LeaderboardPeriod.WEEK, period_start__lt=calculate_current_week_start())
+        .exclude(period_start__in=WeeklyScoreboardSnapshot.objects.values("week_start"))
+        .order_by("period_start")
+        .values_list("period_start", flat=True)
+        .distinct()
+    )
+
+
+def archive_week(week_start, top_places_count=100):
+    """
+    Freezes the scoreboard of a finished week into a snapshot and drops the
+    live leaderboard rows of that week.
+    """
+    leaderboard = Leaderboard(LeaderboardPeriod.WEEK, week_start)
+    ranked_scores = RankedScores.from_queryset(leaderboard.entries)
+
+    with transaction.atomic():
+        user_places = ranked_scores.get_user_places()
+        snapshot = WeeklyScoreboardSnapshot.objects.create(
+            week_start=week_start,
+            top_places=ranked_scores.get_places(1, top_places_count),
+            last_place=max((place for _, place, _ in user_places), default=0),
+        )
+        WeeklyScoreboardPlace.objects.bulk_create(
+            [
+                WeeklyScoreboardPlace(snapshot=snapshot, user_id=user_id, place=place, points=points)
+                for user_id, place, points in user_places
+            ],
+            batch_size=1000,
+        )
+        leaderboard.entries.delete()
+        leaderboard.rank_index_buckets.delete()
+
+    return snapshot
+
+
+def get_archived_user_result(snapshot, user):
+    place = snapshot.places.filter(user=user).values_list("place", "points").first()
+    if place is None:
+        # Users that didn't score that week are placed after everyone else
+        return {"place": snapshot.last_place + 1, "username": user.username, "points": 0}
+    return {"place": place[0], "username": user.username, "points": place[1]}
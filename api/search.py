@@ -0,0 +1,66 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, Func, Q, TextField
+from django.db.models.functions import Length
+
+# Keep in sync with the `api_fold_diacritics` SQL function created by migration 0040
+POLISH_DIACRITICS = "ąćęłńóśźżĄĆĘŁŃÓŚŹŻ"
+FOLDED_DIACRITICS = "acelnoszzACELNOSZZ"
+
+_FOLD_TABLE = str.maketrans(POLISH_DIACRITICS, FOLDED_DIACRITICS)
+_WORD_RE = re.compile(r"\w+")
+
+
+class FoldDiacritics(Func):
+    """
+    Lowercases text and replaces Polish diacritics with their base letters,
+    so "Żółw" and "zolw" compare equal. Backed by an immutable SQL function,
+    which lets the search indexes be built on it.
+    """
+    function = "api_fold_diacritics"
+    output_field = TextField()
+
+
+def fold_diacritics(text):
+    return text.translate(_FOLD_TABLE).lower()
+
+
+def get_translation_search_vector():
+    return SearchVector(FoldDiacritics("english"), FoldDiacritics("polish"), config="simple")
+
+
+def search_translations(translations, text):
+    """
+    Full-text search of translations by words of both languages. Every word
+    of the text matches as a prefix, the best ranked translations come first.
+    """
+    words = _WORD_RE.findall(fold_diacritics(text))
+    if not words:
+        return translations.none()
+
+    query = SearchQuery(" & ".join(f"{word}:*" for word in words), config="simple", search_type="raw")
+    return (
+        translations
+        .annotate(search=get_translation_search_vector())
+        .filter(search=query)
+        .annotate(rank=SearchRank(F("search"), query))
+        .order_by("-rank", Length("english"), "id")
+    )
+
+
+def autocomplete_translations(translations, prefix):
+    """
+    Translations whose English or Polish text starts with the prefix,
+    shortest first.
+    """
+    prefix = fold_diacritics(prefix.strip())
+    if not prefix:
+        return translations.none()
+
+    return (
+        translations
+        .annotate(folded_english=FoldDiacritics("english"), folded_polish=FoldDiacritics("polish"))
+        .filter(Q(folded_english__startswith=prefix) | Q(folded_polish__startswith=prefix))
+        .order_by(Length("english"), "english", "id")
+    )
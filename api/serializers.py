@@ -1,27 +1,55 @@
 # serializers.py
 from django.db.models import Sum
-from rest_framework import serializers
+from rest_framework import permissions, serializers
 
-from api.helpers import calculate_current_week_start
-from api.models import Translation, WordSet, MemoryGameSession, FallingWordsGameSession, CustomUser, ScoreHistory, \
+from api.helpers import calculate_current_week_start, get_level_for_score, get_score_goal_for_level
+from api.models import Translation, WordSet, MemoryGameSession, FallingWordsGameSession, CustomUser, DailyScore, \
     Friendship, FriendRequest
+from api.wordset_unlocks import evaluate_wordset_unlocks
+from api.write_behind import get_pending_score
 from djoser.serializers import UserCreateSerializer, UserSerializer
 
 
+class SparseFieldsetsMixin:
+    """
+    Lets clients of read requests choose the serialized fields with
+    `?fields=id,english` or leave some out with `?omit=star`. Fields that are
+    not requested are dropped before serialization, so their method fields
+    and the queries behind them never run. Nested serializers are left intact.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get('request')
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return
+
+        requested = request.query_params.get('fields')
+        omitted = request.query_params.get('omit')
+        if requested:
+            requested = set(requested.split(','))
+            for field_name in set(self.fields) - requested:
+                self.fields.pop(field_name)
+        if omitted:
+            for field_name in set(omitted.split(',')) & set(self.fields):
+                self.fields.pop(field_name)
+
+
 class CustomUserCreateSerializer(UserCreateSerializer):
     class Meta(UserCreateSerializer.Meta):
         model = CustomUser
         fields = ('id', 'username', 'email', 'password', 'avatar')
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(SparseFieldsetsMixin, UserSerializer):
     class Meta(UserSerializer.Meta):
         model = CustomUser
         read_only_fields = ('level', 'avatar')
         fields = ('id', 'username', 'level', 'avatar', 'llama')
 
 
-class MyProfileSerializer(serializers.ModelSerializer):
+class MyProfileSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     current_week_points = serializers.SerializerMethodField()
     points_to_next_level = serializers.SerializerMethodField()
 
@@ -36,10 +64,10 @@ class MyProfileSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request:
             current_week_start = calculate_current_week_start()
-            current_week_points = ScoreHistory.objects.filter(
+            current_week_points = DailyScore.objects.filter(
                 user=request.user,
-                date__gte=current_week_start
-            ).aggregate(total_points=Sum('score_gained'))['total_points'] or 0
+                day__gte=current_week_start
+            ).aggregate(total_points=Sum('points'))['total_points'] or 0
 
             return current_week_points
         return 0
@@ -48,8 +76,25 @@ class MyProfileSerializer(serializers.ModelSerializer):
     def get_points_to_next_level(obj):
         return obj.get_points_to_next_level()
 
-
-class TranslationSerializer(serializers.ModelSerializer):
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+
+        # Results still spooled by the write-behind writer count right away
+        pending_score = get_pending_score(instance)
+        if pending_score:
+            score = instance.score + pending_score
+            level = max(instance.level, get_level_for_score(score))
+            updated = {
+                'score': score,
+                'level': level,
+                'current_week_points': data.get('current_week_points', 0) + pending_score,
+                'points_to_next_level': get_score_goal_for_level(level + 1) - score,
+            }
+            data.update({field: value for field, value in updated.items() if field in data})
+        return data
+
+
+class TranslationSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     star = serializers.SerializerMethodField()
 
     class Meta:
@@ -58,8 +103,11 @@ class TranslationSerializer(serializers.ModelSerializer):
         fields = ('id', 'english', 'polish', 'star')
 
     def get_star(self, obj):
+        # Translations read with `Translation.with_star_for_user` already carry the star
+        if hasattr(obj, 'star'):
+            return obj.star
+
         request = self.context.get('request')
-        print(obj)
         return obj.get_starred_by_user(request.user)
 
 
@@ -69,10 +117,10 @@ class WordSetSummarySerializer(serializers.ModelSerializer):
         fields = ('id', 'english', 'polish', 'category', 'difficulty')
 
 
-class WordSetSerializer(serializers.ModelSerializer):
+class WordSetSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     locked = serializers.SerializerMethodField()
     points = serializers.SerializerMethodField()
-    depends_on = WordSetSummarySerializer(many=True, source='get_easier_wordsets_from_category')
+    depends_on = serializers.SerializerMethodField()
 
     class Meta:
         model = WordSet
@@ -80,17 +128,22 @@ class WordSetSerializer(serializers.ModelSerializer):
                   'points', 'depends_on'
                   )
 
-    def get_points(self, obj):
-        request = self.context.get('request')
-        user = request.user
+    def get_unlock_state(self, obj):
+        # Unlock states of the whole catalogue are evaluated once and shared by all serialized wordsets
+        if 'wordset_unlocks' not in self.context:
+            request = self.context.get('request')
+            self.context['wordset_unlocks'] = evaluate_wordset_unlocks(request.user)
 
-        return obj.get_total_points_for_user(user)
+        return self.context['wordset_unlocks'][obj.pk]
+
+    def get_points(self, obj):
+        return self.get_unlock_state(obj).points
 
     def get_locked(self, obj):
-        request = self.context.get('request')
-        user = request.user
+        return self.get_unlock_state(obj).locked
 
-        return obj.is_locked_for_user(user)
+    def get_depends_on(self, obj):
+        return WordSetSummarySerializer(self.get_unlock_state(obj).depends_on, many=True).data
 
 
 class WordSetWithTranslationSerializer(WordSetSerializer):
@@ -101,16 +154,16 @@ class WordSetWithTranslationSerializer(WordSetSerializer):
         fields = WordSetSerializer.Meta.fields + ('words',)
 
 
-class MemoryGameSessionSerializer(serializers.ModelSerializer):
+class MemoryGameSessionSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = MemoryGameSession
-        fields = '__all__'
+        exclude = ('opponents',)
 
 
-class FallingWordsGameSessionSerializer(serializers.ModelSerializer):
+class FallingWordsGameSessionSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = FallingWordsGameSession
-        fields = '__all__'
+        exclude = ('opponents',)
 
 
 class FriendAccountSerializer(UserSerializer):
@@ -118,7 +171,7 @@ class FriendAccountSerializer(UserSerializer):
         fields = ('id', 'username', 'email', 'level', 'avatar')
 
 
-class FriendshipSerializer(serializers.ModelSerializer):
+class FriendshipSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     friendship_id = serializers.IntegerField(source='id', read_only=True)
     friend = FriendAccountSerializer()
 
@@ -127,7 +180,7 @@ class FriendshipSerializer(serializers.ModelSerializer):
         fields = ['friendship_id', 'friend']
 
 
-class FriendRequestSerializer(serializers.ModelSerializer):
+class FriendRequestSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     accepted = serializers.BooleanField(required=False)
 
     class Meta:
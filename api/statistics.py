@@ -0,0 +1,321 @@
+import hashlib
+from abc import ABC, abstractmethod
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from functools import reduce, wraps
+from operator import add
+from typing import Optional
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, DateField, F
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from rest_framework import status
+from rest_framework.response import Response
+
+from api.models import DailyScore, ScoreHistory, UserActivityDay, UserStatisticsVersion, UserStreak, \
+    GAME_NAMES_MODELS_MAPPING
+
+
+def get_activity_days(user, game):
+    """
+    Returns days on which the user played the game (or any game for
+    'all_games'), annotated with the number of played `sessions`.
+    Returns None when the game name is unknown.
+    """
+    if game == "all_games":
+        sessions = reduce(add, (F(game_name) for game_name in GAME_NAMES_MODELS_MAPPING))
+    elif game in GAME_NAMES_MODELS_MAPPING:
+        sessions = F(game)
+    else:
+        return None
+
+    return UserActivityDay.objects.filter(user=user).annotate(sessions=sessions).filter(sessions__gt=0)
+
+
+@dataclass
+class Streaks:
+    current: int
+    longest: int
+    longest_start: Optional[date]
+    longest_end: Optional[date]
+
+
+def get_streaks(activity_days, today):
+    """
+    Computes streaks of consecutive activity days in the database. Days are
+    grouped into islands of consecutive days by subtracting their row number,
+    only the longest island and the one ending `today` leave the database.
+    The earliest island wins when several are equally long.
+    """
+    days_sql, days_params = activity_days.values("day").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH islands AS (
+                SELECT days.day, days.day - (ROW_NUMBER() OVER (ORDER BY days.day))::integer AS island
+                FROM ({days_sql}) days (day)
+            ), streaks AS (
+                SELECT MIN(day) AS start_day, MAX(day) AS end_day, COUNT(*) AS length
+                FROM islands GROUP BY island
+            )
+            SELECT COALESCE(current_streak.length, 0), COALESCE(longest_streak.length, 0),
+                   longest_streak.start_day, longest_streak.end_day
+            FROM (SELECT 1) result
+            LEFT JOIN (SELECT * FROM streaks ORDER BY length DESC, start_day LIMIT 1) longest_streak ON TRUE
+            LEFT JOIN streaks current_streak ON current_streak.end_day = %s
+            """,
+            days_params + (today,),
+        )
+        return Streaks(*cursor.fetchone())
+
+
+def get_user_streaks(user, game, activity_days, today):
+    """
+    Returns streaks of the user in the game. Streaks across all games are
+    read from the stored `UserStreak`, other games, and users without a
+    stored streak, are computed from `activity_days`.
+    """
+    streak = UserStreak.objects.filter(user=user).first() if game == "all_games" else None
+    if streak is None:
+        return get_streaks(activity_days, today)
+    return Streaks(streak.get_current_streak(today), streak.longest_streak,
+                   streak.longest_streak_start, streak.longest_streak_end)
+
+
+class DashboardWidget(ABC):
+    """
+    Statistic computed from daily scores of a user. Every widget is fed the
+    same rows, ordered by day, in a single pass over the user's history.
+    """
+
+    def __init__(self, params, today):
+        self.game = params.get("game", "all_games")
+        if self.game != "all_games" and self.game not in GAME_NAMES_MODELS_MAPPING:
+            raise ValueError(
+                "Invalid game name. Valid game names are: " + ", ".join(GAME_NAMES_MODELS_MAPPING.keys()) +
+                "or 'all_games'.")
+        self.today = today
+
+    def accepts(self, game_name):
+        return self.game == "all_games" or self.game == game_name
+
+    @abstractmethod
+    def add(self, day, game_name, points, sessions):
+        pass
+
+    @abstractmethod
+    def result(self):
+        pass
+
+
+class CalendarWidget(DashboardWidget):
+    def __init__(self, params, today):
+        super().__init__(params, today)
+        self.month, self.year = params.get("month", today.month), params.get("year", today.year)
+        if not all(isinstance(arg, int) for arg in [self.month, self.year]):
+            raise ValueError("Invalid data types in the request body. All values should be integers.")
+
+        self.start_date = date(self.year, self.month, 1)
+        if self.start_date > today:
+            raise ValueError("Future dates are not allowed.")
+        self.end_date = self.start_date.replace(day=1, month=self.start_date.month % 12 + 1,
+                                                year=self.start_date.year + self.start_date.month // 12) \
+            - timedelta(days=1)
+        self.calendar = {str(day): 0 for day in range(1, self.end_date.day + 1)}
+
+    def add(self, day, game_name, points, sessions):
+        if self.accepts(game_name) and self.start_date <= day <= self.end_date:
+            self.calendar[str(day.day)] += sessions
+
+    def result(self):
+        return {"calendar": self.calendar, "month": self.month, "year": self.year}
+
+
+class TotalDaysWidget(DashboardWidget):
+    def __init__(self, params, today):
+        super().__init__(params, today)
+        self.last_day = None
+        self.total_days = 0
+
+    def add(self, day, game_name, points, sessions):
+        if self.accepts(game_name) and sessions and day != self.last_day:
+            self.total_days += 1
+            self.last_day = day
+
+    def result(self):
+        return {"total_days": self.total_days}
+
+
+class StreakWidget(DashboardWidget):
+    def __init__(self, params, today):
+        super().__init__(params, today)
+        # Days arrive in order, so the incremental streak tracker can be reused without saving it
+        self.streak = UserStreak()
+
+    def add(self, day, game_name, points, sessions):
+        if self.accepts(game_name) and sessions:
+            self.streak.add_active_day(day)
+
+
+class LongestStreakWidget(StreakWidget):
+    def result(self):
+        return {
+            "longest_streak": self.streak.longest_streak,
+            "start_date": self.streak.longest_streak_start.strftime("%Y-%m-%d")
+            if self.streak.longest_streak_start else None,
+            "end_date": self.streak.longest_streak_end.strftime("%Y-%m-%d")
+            if self.streak.longest_streak_end else None,
+        }
+
+
+class CurrentStreakWidget(StreakWidget):
+    def result(self):
+        return {"current_streak": self.streak.get_current_streak(self.today)}
+
+
+class GamePointsWidget(DashboardWidget):
+    def __init__(self, params, today):
+        super().__init__(params, today)
+        self.total_points = 0
+
+    def add(self, day, game_name, points, sessions):
+        if self.accepts(game_name):
+            self.total_points += points
+
+    def result(self):
+        return {"total_points": self.total_points}
+
+
+DASHBOARD_WIDGETS = {
+    "calendar": CalendarWidget,
+    "total_days": TotalDaysWidget,
+    "longest_streak": LongestStreakWidget,
+    "current_streak": CurrentStreakWidget,
+    "game_points": GamePointsWidget,
+}
+
+
+def get_dashboard(user, requested_widgets, today):
+    """
+    Computes the requested widgets ({name: params}) with one query and one
+    pass over the user's daily scores. Raises ValueError on invalid input.
+    """
+    widgets = {}
+    for name, params in requested_widgets.items():
+        if name not in DASHBOARD_WIDGETS:
+            raise ValueError("Unknown widget. Available widgets: " + ", ".join(DASHBOARD_WIDGETS.keys()) + ".")
+        widgets[name] = DASHBOARD_WIDGETS[name](params or {}, today)
+
+    daily_scores = DailyScore.objects.filter(user=user).order_by("day").values_list(
+        "day", "game_name", "points", "sessions")
+    for day, game_name, points, sessions in daily_scores.iterator():
+        for widget in widgets.values():
+            widget.add(day, game_name, points, sessions)
+
+    return {name: widget.result() for name, widget in widgets.items()}
+
+
+ACTIVITY_GRANULARITIES = {
+    "day": TruncDate,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+MAX_ACTIVITY_BUCKETS = 1000
+
+
+def get_bucket_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def get_next_bucket_start(bucket_start, granularity):
+    if granularity == "week":
+        return bucket_start + timedelta(days=7)
+    if granularity == "month":
+        return date(bucket_start.year + bucket_start.month // 12, bucket_start.month % 12 + 1, 1)
+    return bucket_start + timedelta(days=1)
+
+
+def get_activity_counts(user, game, start_date, end_date, granularity, tzinfo):
+    """
+    Returns the number of games played in every day, week or month between
+    the dates (inclusive), as a dense list starting at the bucket containing
+    `start_date`. Games are assigned to days in the given time zone.
+    """
+    bucket_starts = []
+    bucket_start = get_bucket_start(start_date, granularity)
+    while bucket_start <= end_date:
+        bucket_starts.append(bucket_start)
+        bucket_start = get_next_bucket_start(bucket_start, granularity)
+    if len(bucket_starts) > MAX_ACTIVITY_BUCKETS:
+        raise ValueError(f"Date range is too long, at most {MAX_ACTIVITY_BUCKETS} buckets can be requested.")
+
+    history = ScoreHistory.objects.filter(
+        user=user,
+        date__gte=datetime.combine(start_date, time.min, tzinfo),
+        date__lt=datetime.combine(end_date + timedelta(days=1), time.min, tzinfo),
+    )
+    if game != "all_games":
+        history = history.filter(game_name=game)
+
+    truncate = ACTIVITY_GRANULARITIES[granularity]
+    counts = dict(
+        history
+        .annotate(bucket=truncate("date", output_field=DateField(), tzinfo=tzinfo))
+        .values("bucket")
+        .annotate(count=Count("id"))
+        .values_list("bucket", "count")
+    )
+    return bucket_starts[0], [counts.get(bucket_start, 0) for bucket_start in bucket_starts]
+
+
+STATISTICS_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def cached_statistics(view):
+    """
+    Caches successful responses of a statistics view per user, endpoint,
+    parameters and statistics version. Responses carry an ETag, a request
+    with a matching If-None-Match gets a 304 without computing anything.
+    Recording a game bumps the user's version, stored in the database so
+    every process sees it, which invalidates both.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            params = json.dumps(json.loads(request.body or b"{}"), sort_keys=True)
+        except ValueError:
+            params = request.body.decode(errors="replace")
+
+        # Results like the current streak depend on the day they are computed on
+        version = UserStatisticsVersion.get_version(request.user)
+        key_source = ":".join([
+            str(request.user.pk), view.__name__, params, request.GET.urlencode(),
+            date.today().isoformat(), str(version),
+        ])
+        digest = hashlib.sha1(key_source.encode()).hexdigest()
+        etag = f'"{digest}"'
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        cache_key = f"statistics:{digest}"
+        data = cache.get(cache_key)
+        if data is None:
+            response = view(request, *args, **kwargs)
+            if not isinstance(response, Response) or response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(cache_key, response.data, STATISTICS_CACHE_TIMEOUT)
+        else:
+            response = Response(data)
+
+        response["ETag"] = etag
+        return response
+
+    return wrapper
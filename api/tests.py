@@ -0,0 +1,797 @@
+import csv
+import gzip
+import json
+import random
+import tempfile
+import warnings
+from importlib import import_module
+from datetime import date, datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from time import monotonic
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.catalogue import CATALOGUE_VERSION_CHECK_INTERVAL, get_catalogue_version, get_translation_catalogue
+from api.consumers.waitroom_consumer import is_wordset_locked_for_user
+from api.game_sessions import MAX_INTEGER
+from api.helpers import calculate_current_week_start, get_level_for_score, get_score_goal_for_level
+from api.models import ALL_TIME_PERIOD_START, CatalogueVersion, CustomUser, GameSession, LeaderboardEntry, \
+    LeaderboardPeriod, LeaderboardRankIndex, MemoryGameSession, RaceGameSession, ScoreHistory, Translation, \
+    UserActivityDay, UserStatisticsVersion, UserStreak, WordSet, WordSetCategory, WordSetProgress
+from api.partitions import add_months, get_month_start, get_partition_name, get_partitions
+from api.ranking import RankedScores
+from api.scoreboard import Leaderboard
+from api.statistics import Streaks, get_activity_days, get_streaks, get_user_streaks
+from api.write_behind import GameResultSpool
+
+
+class ScoreboardEndpointTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("third", password="third")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.add_points(first=30, second=20, third=10, fourth=10, fifth=5)
+
+    def add_points(self, week_start=None, **points):
+        for username, user_points in points.items():
+            user, _ = CustomUser.objects.get_or_create(username=username)
+            LeaderboardEntry.add_points(user, user_points, week_start or calculate_current_week_start())
+
+    def get_scoreboard(self, **body):
+        return self.client.post("/scoreboard/", json.dumps(body), content_type="application/json")
+
+    def test_all_time_scoreboard(self):
+        response = self.get_scoreboard(period="all_time")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"], {"place": 3, "username": "third", "points": 10})
+        self.assertEqual([(place["place"], place["username"]) for place in response.data["top_100"]],
+                         [(1, "first"), (2, "second"), (3, "fourth"), (3, "third"), (4, "fifth")])
+        self.assertNotIn("around", response.data)
+
+    def test_entries_around_the_user(self):
+        response = self.get_scoreboard(period="this_week", around=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(place["place"], place["username"]) for place in response.data["around"]],
+                         [(3, "fourth"), (3, "third"), (4, "fifth")])
+
+    def test_around_must_be_a_number(self):
+        self.assertEqual(self.get_scoreboard(period="all_time", around=True).status_code, 400)
+        self.assertEqual(self.get_scoreboard(period="all_time", around=-1).status_code, 400)
+
+    def test_archived_week(self):
+        last_week = calculate_current_week_start() - timedelta(days=7)
+        self.add_points(week_start=last_week, first=5, third=15)
+        call_command("archive_weekly_scoreboards", stdout=StringIO())
+
+        response = self.client.get("/scoreboard/history/")
+        self.assertEqual(response.data, {"weeks": [last_week.strftime("%Y-%m-%d")]})
+
+        response = self.client.post("/scoreboard/history/", json.dumps({"week_start": str(last_week)}),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"], {"place": 1, "username": "third", "points": 15})
+        self.assertEqual([place["username"] for place in response.data["top_100"]], ["third", "first"])
+        self.assertFalse(LeaderboardEntry.objects.filter(period=LeaderboardPeriod.WEEK, period_start=last_week)
+                         .exists())
+
+    def test_week_that_is_not_archived(self):
+        response = self.client.post("/scoreboard/history/", json.dumps({"week_start": "2024-01-01"}),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 404)
+
+
+class LeaderboardRankIndexTest(TestCase):
+    def setUp(self):
+        self.leaderboard = Leaderboard(LeaderboardPeriod.ALL_TIME, ALL_TIME_PERIOD_START)
+
+    def add_points(self, username, points):
+        user, _ = CustomUser.objects.get_or_create(username=username)
+        LeaderboardEntry.add_points(user, points, date(2024, 1, 1))
+
+    def get_buckets(self):
+        return dict(LeaderboardRankIndex.objects.filter(period=LeaderboardPeriod.ALL_TIME)
+                    .values_list("points", "users_count"))
+
+    def test_emptied_bucket_is_reused(self):
+        self.add_points("first", 10)
+        self.add_points("first", 10)
+        self.add_points("second", 20)
+        self.assertEqual(self.get_buckets(), {10: 0, 20: 2})
+
+        self.add_points("third", 10)
+        self.assertEqual(self.get_buckets(), {10: 1, 20: 2})
+
+    def test_empty_buckets_hold_no_place(self):
+        self.add_points("first", 30)
+        self.add_points("first", 10)
+        self.add_points("second", 20)
+
+        self.assertEqual(self.leaderboard.get_place(40), 1)
+        self.assertEqual(self.leaderboard.get_place(20), 2)
+        self.assertEqual(self.leaderboard.get_place(0), 3)
+        self.assertEqual([place["points"] for place in self.leaderboard.get_top_places()], [40, 20])
+
+
+class RankedScoresTest(TestCase):
+    def setUp(self):
+        self.wordset = WordSet.objects.create(english="ranking", polish="ranking")
+        self.user = CustomUser.objects.create_user("unranked", password="unranked")
+
+    def set_points(self, **points):
+        for username, user_points in points.items():
+            user = CustomUser.objects.create_user(username, password=username)
+            WordSetProgress.objects.create(user=user, wordset=self.wordset, points=user_points)
+
+    def test_user_without_points_shares_the_zero_place(self):
+        self.set_points(first=20, second=0)
+        result = RankedScores.for_wordset(self.wordset).get_user_result(self.user)
+        self.assertEqual(result, {"place": 2, "username": "unranked", "points": 0})
+
+    def test_user_without_points_is_placed_last(self):
+        self.set_points(first=20, second=10)
+        result = RankedScores.for_wordset(self.wordset).get_user_result(self.user)
+        self.assertEqual(result, {"place": 3, "username": "unranked", "points": 0})
+
+    def test_user_without_points_is_first_of_empty_ranking(self):
+        result = RankedScores.for_wordset(self.wordset).get_user_result(self.user)
+        self.assertEqual(result, {"place": 1, "username": "unranked", "points": 0})
+
+    def test_wordset_ranking_since_a_day(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            self.assertEqual(RankedScores.for_wordset(self.wordset, since=date(2024, 1, 1)).get_places(), [])
+
+
+def reference_streaks(days, today):
+    """
+    Straightforward streak computation over a set of activity days.
+    """
+    current = 0
+    day = today
+    while day in days:
+        current += 1
+        day -= timedelta(days=1)
+
+    longest, longest_start, longest_end = 0, None, None
+    for start in sorted(days):
+        if start - timedelta(days=1) in days:
+            continue
+        end = start
+        while end + timedelta(days=1) in days:
+            end += timedelta(days=1)
+        length = (end - start).days + 1
+        if length > longest:
+            longest, longest_start, longest_end = length, start, end
+
+    return Streaks(current, longest, longest_start, longest_end)
+
+
+class StreaksTest(TestCase):
+    TODAY = date(2024, 3, 1)
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("streaks", password="streaks")
+
+    def set_activity(self, days, game_name="memory"):
+        UserActivityDay.objects.filter(user=self.user).delete()
+        UserActivityDay.objects.bulk_create(
+            UserActivityDay(user=self.user, day=day, **{game_name: 1}) for day in days
+        )
+
+    def assert_matches_reference(self, days, game="all_games"):
+        self.set_activity(days)
+        streaks = get_streaks(get_activity_days(self.user, game), self.TODAY)
+        self.assertEqual(streaks, reference_streaks(set(days), self.TODAY))
+
+    def days_ago(self, *offsets):
+        return [self.TODAY - timedelta(days=offset) for offset in offsets]
+
+    def test_no_activity(self):
+        self.assert_matches_reference([])
+
+    def test_single_day(self):
+        self.assert_matches_reference(self.days_ago(0))
+        self.assert_matches_reference(self.days_ago(10))
+
+    def test_current_streak_requires_activity_today(self):
+        self.assert_matches_reference(self.days_ago(1, 2, 3))
+        self.assert_matches_reference(self.days_ago(0, 1, 2, 4))
+
+    def test_earliest_of_equally_long_streaks_is_longest(self):
+        self.assert_matches_reference(self.days_ago(0, 1, 5, 6, 9, 10))
+
+    def test_streak_across_month_and_year(self):
+        self.assert_matches_reference([date(2023, 12, 30), date(2023, 12, 31), date(2024, 1, 1), date(2024, 2, 29)])
+
+    def test_multiple_sessions_on_one_day_keep_the_streak(self):
+        self.set_activity(self.days_ago(0, 1, 2))
+        UserActivityDay.objects.filter(user=self.user).update(memory=3, race=2)
+        streaks = get_streaks(get_activity_days(self.user, "all_games"), self.TODAY)
+        self.assertEqual(streaks, Streaks(3, 3, self.TODAY - timedelta(days=2), self.TODAY))
+
+    def test_other_games_are_ignored(self):
+        self.set_activity(self.days_ago(0, 1, 2), game_name="race")
+        streaks = get_streaks(get_activity_days(self.user, "memory"), self.TODAY)
+        self.assertEqual(streaks, Streaks(0, 0, None, None))
+
+    def test_random_activity(self):
+        generator = random.Random(8)
+        for _ in range(25):
+            offsets = generator.sample(range(60), generator.randint(1, 40))
+            self.assert_matches_reference(self.days_ago(*offsets))
+
+
+class UserStreakTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("streaks", password="streaks")
+
+    def test_incremental_streaks_match_reference(self):
+        generator = random.Random(9)
+        start = date(2024, 1, 1)
+        days = sorted(start + timedelta(days=offset) for offset in generator.sample(range(90), 50))
+
+        for day in days:
+            UserStreak.record_activity(self.user, day)
+            UserStreak.record_activity(self.user, day)
+
+        streak = UserStreak.objects.get(user=self.user)
+        expected = reference_streaks(set(days), days[-1])
+        self.assertEqual(
+            Streaks(streak.get_current_streak(days[-1]), streak.longest_streak,
+                    streak.longest_streak_start, streak.longest_streak_end),
+            expected,
+        )
+        self.assertEqual(streak.get_current_streak(days[-1] + timedelta(days=1)), 0)
+
+    def set_activity(self, days):
+        UserActivityDay.objects.bulk_create(UserActivityDay(user=self.user, day=day, memory=1) for day in days)
+
+    def test_missing_streak_is_computed_from_activity(self):
+        today = date(2024, 3, 1)
+        days = [today - timedelta(days=offset) for offset in (0, 1, 2, 5, 6, 7, 8)]
+        self.set_activity(days)
+
+        streaks = get_user_streaks(self.user, "all_games", get_activity_days(self.user, "all_games"), today)
+        self.assertEqual(streaks, reference_streaks(set(days), today))
+
+    def test_migration_builds_streaks_from_activity(self):
+        generator = random.Random(10)
+        days = sorted(date(2024, 1, 1) + timedelta(days=offset) for offset in generator.sample(range(90), 50))
+        self.set_activity(days)
+
+        import_module("api.migrations.0036_populate_userstreak").populate_streaks(apps, None)
+
+        streak = UserStreak.objects.get(user=self.user)
+        self.assertEqual(
+            Streaks(streak.get_current_streak(days[-1]), streak.longest_streak,
+                    streak.longest_streak_start, streak.longest_streak_end),
+            reference_streaks(set(days), days[-1]),
+        )
+
+
+class GameSessionScoreTest(TestCase):
+    def test_saving_a_session_again_grants_no_score(self):
+        user = CustomUser.objects.create_user("racer", password="racer")
+        opponent = CustomUser.objects.create_user("opponent", password="opponent")
+        wordset = WordSet.objects.create(english="race", polish="wyscig")
+
+        # Multiplayer consumers save a session once more after adding its opponents
+        session = RaceGameSession.objects.create(user=user, wordset=wordset, score=10)
+        session.opponents.add(opponent)
+        session.save()
+
+        self.assertEqual(CustomUser.objects.get(pk=user.pk).score, 10)
+        self.assertEqual(ScoreHistory.objects.filter(user=user).count(), 1)
+        self.assertEqual(list(user.activity_days.values_list("race", flat=True)), [1])
+
+
+class StatisticsCacheTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("cached", password="cached")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.wordset = WordSet.objects.create(english="cached", polish="zapisany")
+
+    def get_total_days(self, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get("/statistics/total-days/", **headers)
+
+    def test_version_bumped_elsewhere_invalidates_the_etag(self):
+        etag = self.get_total_days()["ETag"]
+        self.assertEqual(self.get_total_days(etag).status_code, 304)
+
+        # Another process records a game
+        UserStatisticsVersion.bump(self.user)
+        self.assertEqual(self.get_total_days(etag).status_code, 200)
+
+    def test_recorded_game_invalidates_cached_statistics(self):
+        self.assertEqual(self.get_total_days().data, {"total_days": 0})
+        GameSession.objects.create(user=self.user, wordset=self.wordset, score=10, game_name="memory")
+        self.assertEqual(self.get_total_days().data, {"total_days": 1})
+
+
+@override_settings(TIME_ZONE="Europe/Warsaw")
+class ActivityStatsTest(TestCase):
+    ZONE = ZoneInfo("Europe/Warsaw")
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("activity", password="activity")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def play_at(self, *moments):
+        for moment in moments:
+            entry = ScoreHistory.objects.create(user=self.user, game_name="memory", score_gained=10)
+            ScoreHistory.objects.filter(pk=entry.pk).update(date=moment.replace(tzinfo=self.ZONE))
+
+    def get_counts(self, start, end, granularity):
+        response = self.client.post("/statistics/activity/", {"start": start, "end": end, "granularity": granularity},
+                                    format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.data["start"], response.data["counts"]
+
+    def test_days_start_at_local_midnight(self):
+        # 23:30 on March 2nd and 00:30 on March 3rd local time are both on March 2nd in UTC
+        self.play_at(datetime(2024, 3, 2, 23, 30), datetime(2024, 3, 3, 0, 30), datetime(2024, 3, 3, 23, 30))
+        self.assertEqual(self.get_counts("2024-03-02", "2024-03-04", "day"), ("2024-03-02", [1, 2, 0]))
+
+    def test_weeks_start_on_local_monday(self):
+        # Sunday 23:30 and Monday 00:30 local time, both on Sunday in UTC
+        self.play_at(datetime(2024, 3, 3, 23, 30), datetime(2024, 3, 4, 0, 30))
+        self.assertEqual(self.get_counts("2024-02-26", "2024-03-10", "week"), ("2024-02-26", [1, 1]))
+
+    def test_months_start_at_local_midnight(self):
+        # 23:30 on March 31st and 00:30 on April 1st local time are both on March 31st in UTC
+        self.play_at(datetime(2024, 3, 31, 23, 30), datetime(2024, 4, 1, 0, 30))
+        self.assertEqual(self.get_counts("2024-03-01", "2024-04-30", "month"), ("2024-03-01", [1, 1]))
+
+    def test_range_bounds_are_local_days(self):
+        self.play_at(datetime(2024, 3, 1, 0, 30), datetime(2024, 3, 31, 23, 30), datetime(2024, 4, 1, 0, 30))
+        self.assertEqual(self.get_counts("2024-03-01", "2024-03-31", "month"), ("2024-03-01", [2]))
+
+
+class WaitroomWordSetLockTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("waitroom", password="waitroom")
+        self.easy = WordSet.objects.create(english="easy", polish="latwy", category=WordSetCategory.ANIMALS,
+                                           difficulty=1)
+        self.hard = WordSet.objects.create(english="hard", polish="trudny", category=WordSetCategory.ANIMALS,
+                                           difficulty=2)
+
+    def is_locked(self, wordset):
+        # Called without the async wrapper, which closes the test's connection
+        return is_wordset_locked_for_user.func(self.user, wordset)
+
+    def test_easiest_wordset_is_unlocked(self):
+        self.assertFalse(self.is_locked(self.easy))
+
+    def test_harder_wordset_waits_for_easier_ones(self):
+        self.assertTrue(self.is_locked(self.hard))
+
+        WordSetProgress.objects.create(user=self.user, wordset=self.easy, points=100, unlocked=True)
+        self.assertFalse(self.is_locked(self.hard))
+
+
+class TranslationEndpointTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("translations", password="translations")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.wordset = WordSet.objects.create(english="zoo", polish="zoo")
+        self.zebra = self.wordset.words.create(english="zebra", polish="zebra")
+        self.tortoise = self.wordset.words.create(english="tortoise", polish="żółw")
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get(f"/translation/{self.zebra.pk}/", {"fields": "id,english"})
+        self.assertEqual(response.data, {"id": self.zebra.pk, "english": "zebra"})
+
+        response = self.client.get(f"/translation/{self.zebra.pk}/", {"omit": "star"})
+        self.assertEqual(response.data, {"id": self.zebra.pk, "english": "zebra", "polish": "zebra"})
+
+    def test_cursor_pagination(self):
+        response = self.client.get("/translation/", {"page_size": 50, "fields": "id"})
+        ids = [translation["id"] for translation in response.data["results"]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            ids += [translation["id"] for translation in response.data["results"]]
+        self.assertEqual(ids, list(Translation.objects.order_by("id").values_list("id", flat=True)))
+
+        # Without a page size the whole list is returned
+        self.assertEqual(len(self.client.get("/translation/").data), len(ids))
+
+    def test_bulk_star(self):
+        response = self.client.put("/translation/bulk_star/", json.dumps({"ids": [self.zebra.pk, 0], "star": True}),
+                                   content_type="application/json")
+        self.assertEqual(response.data, {"ids": [self.zebra.pk], "star": True})
+        self.assertEqual(list(self.user.favorite_translations.values_list("id", flat=True)), [self.zebra.pk])
+
+        response = self.client.put("/translation/bulk_star/", json.dumps({"ids": [self.zebra.pk], "star": False}),
+                                   content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.user.favorite_translations.exists())
+
+    def test_bulk_star_needs_ids(self):
+        response = self.client.put("/translation/bulk_star/", json.dumps({"ids": [True], "star": True}),
+                                   content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_search(self):
+        response = self.client.get("/translation/search/", {"q": "zolw", "fields": "id"})
+        self.assertEqual(response.data, [{"id": self.tortoise.pk}])
+
+        response = self.client.get("/translation/search/", {"q": "zebra", "limit": -1, "fields": "id"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{"id": self.zebra.pk}])
+
+        self.assertEqual(self.client.get("/translation/search/", {"q": "zebra", "limit": "x"}).status_code, 400)
+
+    def test_autocomplete(self):
+        response = self.client.get("/translation/autocomplete/", {"q": "ŻÓ", "wordset": self.wordset.pk})
+        self.assertEqual([translation["id"] for translation in response.data], [self.tortoise.pk])
+
+
+def forget_translation_catalogue(test):
+    """
+    Test transactions roll the catalogue version back, so a catalogue cached
+    by another test could carry the same version as this test's one.
+    """
+    patcher = mock.patch("api.catalogue._catalogue", None)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+
+class TranslationCatalogueTest(TestCase):
+    def setUp(self):
+        forget_translation_catalogue(self)
+        self.wordset = WordSet.objects.create(english="catalogue", polish="katalog")
+
+    def test_changes_bump_the_shared_version(self):
+        version = get_catalogue_version()
+        self.wordset.words.create(english="cat", polish="kot")
+        self.assertGreater(get_catalogue_version(), version)
+
+    def test_version_bumped_elsewhere_reloads_the_catalogue(self):
+        catalogue = get_translation_catalogue()
+        self.assertEqual(len(catalogue.get_wordset(self.wordset.pk)), 0)
+
+        # Another process adds words without signals reaching this one
+        translation = Translation.objects.create(english="dog", polish="pies")
+        WordSet.words.through.objects.bulk_create([
+            WordSet.words.through(wordset=self.wordset, translation=translation),
+        ])
+        CatalogueVersion.objects.update(version=F("version") + 1)
+
+        # Served from memory until the version is checked again
+        with self.assertNumQueries(0):
+            self.assertIs(get_translation_catalogue(), catalogue)
+        with mock.patch("api.catalogue.monotonic", return_value=monotonic() + CATALOGUE_VERSION_CHECK_INTERVAL):
+            self.assertEqual(get_translation_catalogue().get_wordset(self.wordset.pk).english, ("dog",))
+
+    def import_wordsets(self, *args):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "wordsets.csv"
+            path.write_text("wordset,english,polish\ncatalogue,bird,ptak\n", encoding="utf-8")
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("import_wordsets", path, *args, stdout=StringIO())
+
+    def test_import_bumps_the_shared_version(self):
+        catalogue = get_translation_catalogue()
+        self.import_wordsets()
+        self.assertGreater(get_catalogue_version(), catalogue.version)
+        self.assertEqual(get_translation_catalogue().get_wordset(self.wordset.pk).english, ("bird",))
+
+    def test_import_with_blank_optional_cells(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "wordsets.csv"
+            # Saved by a spreadsheet, with a byte order mark
+            path.write_text("wordset,wordset_polish,category,difficulty,english,polish\nanimals3,,,,cat,kot\n",
+                            encoding="utf-8-sig")
+            call_command("import_wordsets", path, stdout=StringIO())
+
+        wordset = WordSet.objects.get(english="animals3")
+        self.assertEqual((wordset.polish, wordset.category, wordset.difficulty), ("animals3", WordSetCategory.GENERAL, 1))
+        self.assertEqual(list(wordset.words.values_list("english", "polish")), [("cat", "kot")])
+
+    def test_dry_run_import_keeps_the_version(self):
+        version = get_catalogue_version()
+        self.import_wordsets("--dry-run")
+        self.assertEqual(get_catalogue_version(), version)
+
+
+class WordSetBundleTest(TestCase):
+    def setUp(self):
+        forget_translation_catalogue(self)
+        self.user = CustomUser.objects.create_user("bundle", password="bundle")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.easy = WordSet.objects.create(english="easy", polish="latwy", category=WordSetCategory.ANIMALS,
+                                           difficulty=1)
+        self.hard = WordSet.objects.create(english="hard", polish="trudny", category=WordSetCategory.ANIMALS,
+                                           difficulty=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hard.words.create(english="bread", polish="chleb")
+
+    def test_locked_wordset_has_no_bundle(self):
+        response = self.client.get(f"/wordset/{self.hard.pk}/bundle/")
+        self.assertEqual(response.status_code, 403)
+
+    def test_unlocked_wordset_bundle(self):
+        WordSetProgress.objects.create(user=self.user, wordset=self.easy, points=100, unlocked=True)
+        response = self.client.get(f"/wordset/{self.hard.pk}/bundle/")
+        self.assertEqual(response.status_code, 200)
+        word = self.hard.words.get()
+        self.assertEqual(json.loads(response.content), [{"polish": "chleb", "english": "bread", "id": word.pk}])
+
+    def test_each_encoding_has_its_own_etag(self):
+        WordSetProgress.objects.create(user=self.user, wordset=self.easy, points=100, unlocked=True)
+        plain = self.client.get(f"/wordset/{self.hard.pk}/bundle/")
+        gzipped = self.client.get(f"/wordset/{self.hard.pk}/bundle/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(gzipped["Content-Encoding"], "gzip")
+        self.assertNotEqual(plain["ETag"], gzipped["ETag"])
+
+        response = self.client.get(f"/wordset/{self.hard.pk}/bundle/", HTTP_IF_NONE_MATCH=plain["ETag"],
+                                   HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f"/wordset/{self.hard.pk}/bundle/", HTTP_IF_NONE_MATCH=gzipped["ETag"],
+                                   HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 304)
+
+
+class GameSessionBatchTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("batch", password="batch")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.wordset = WordSet.objects.create(english="batch", polish="partia")
+
+    def submit(self, *sessions):
+        return self.client.post("/game-sessions/batch/", {"sessions": sessions}, format="json")
+
+    def get_records(self, user):
+        today = timezone.localdate()
+        return {
+            "score": CustomUser.objects.get(pk=user.pk).score,
+            "history": list(ScoreHistory.objects.filter(user=user).values_list("game_name", "score_gained")),
+            "sessions": list(GameSession.objects.filter(user=user).values_list("game_name", "score")),
+            "leaderboard": list(user.leaderboard_entries.values_list("period", "points")),
+            "daily": list(user.daily_scores.values_list("day", "game_name", "points", "sessions")),
+            "activity": list(user.activity_days.values_list("day", "memory", "falling_words")),
+            "streak": UserStreak.objects.get(user=user).get_current_streak(today),
+            "progress": list(user.wordset_progress.values_list("wordset", "points")),
+        }
+
+    def test_valid_batch(self):
+        response = self.submit({"game": "memory", "wordset": self.wordset.pk, "score": 20, "duration": 30},
+                               {"game": "falling_words", "wordset": self.wordset.pk, "score": 10})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result["status"] for result in response.data["results"]], ["created", "created"])
+
+        # The same sessions saved one by one update the same records
+        other = CustomUser.objects.create_user("single", password="single")
+        GameSession.objects.create(user=other, wordset=self.wordset, score=20, duration=30, game_name="memory")
+        GameSession.objects.create(user=other, wordset=self.wordset, score=10, game_name="falling_words")
+        self.assertEqual(self.get_records(self.user), self.get_records(other))
+
+    def test_mixed_batch(self):
+        response = self.submit({"game": "memory", "wordset": self.wordset.pk, "score": 20},
+                               {"game": "memory", "wordset": [self.wordset.pk], "score": 5},
+                               {"game": "memory", "wordset": True, "score": 5})
+        self.assertEqual(response.status_code, 201)
+        results = response.data["results"]
+        self.assertEqual([result["status"] for result in results], ["created", "invalid", "invalid"])
+        self.assertEqual(results[1]["errors"], {"wordset": "Must be a wordset id."})
+        self.assertEqual(results[2]["errors"], {"wordset": "Must be a wordset id."})
+        self.assertEqual(CustomUser.objects.get(pk=self.user.pk).score, 20)
+
+    def test_invalid_batch(self):
+        response = self.submit({"game": "race", "wordset": self.wordset.pk, "score": 20},
+                               {"game": "memory", "wordset": {"id": self.wordset.pk}, "score": -1},
+                               {"game": "memory", "wordset": self.wordset.pk + 1, "score": 5, "duration": False},
+                               "memory")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result.get("errors") for result in response.data["results"]], [
+            {"game": "Must be one of: memory, falling_words"},
+            {"wordset": "Must be a wordset id.", "score": "Must be an integer from 0 to 2147483647."},
+            {"wordset": "Wordset does not exist.", "duration": "Must be an integer from 0 to 2147483647."},
+            {"session": "Must be an object."},
+        ])
+        self.assertFalse(GameSession.objects.filter(user=self.user).exists())
+        self.assertEqual(CustomUser.objects.get(pk=self.user.pk).score, 0)
+
+
+class AddScoreTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("scorer", password="scorer")
+
+    def test_level_matches_the_score_goals(self):
+        # Up to the highest goal the score column can hold
+        for level in range(0, 23):
+            for score in (get_score_goal_for_level(level) - 1, get_score_goal_for_level(level)):
+                CustomUser.objects.filter(pk=self.user.pk).update(score=0, level=1)
+                self.user.add_score(score, "memory")
+                self.assertEqual(self.user.level, get_level_for_score(score), score)
+                self.assertEqual(CustomUser.objects.get(pk=self.user.pk).level, get_level_for_score(score), score)
+
+    def test_deleted_user_gets_no_score(self):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        CustomUser.objects.filter(pk=self.user.pk).delete()
+        with self.assertRaises(CustomUser.DoesNotExist):
+            user.add_score(10, "memory")
+        self.assertFalse(ScoreHistory.objects.filter(user_id=user.pk).exists())
+
+
+class GameResultSpoolTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "spool" / "game_results.jsonl"
+        self.user = CustomUser.objects.create_user("spool", password="spool")
+        self.wordset = WordSet.objects.create(english="spool", polish="szpula")
+
+    def append(self, spool, score):
+        spool.append(self.user.pk, {"game": "memory", "wordset": self.wordset.pk, "score": score, "duration": 0})
+
+    def get_sessions(self):
+        return list(GameSession.objects.filter(user=self.user).order_by("score").values_list("score", flat=True))
+
+    def test_processes_share_the_spool(self):
+        first, second = GameResultSpool(self.path), GameResultSpool(self.path)
+        self.append(first, 10)
+        self.append(second, 20)
+        self.append(first, 30)
+
+        self.assertEqual(second.get_pending_score(self.user.pk), 60)
+        self.assertEqual(second.write_batch(10), 3)
+        self.assertEqual(self.get_sessions(), [10, 20, 30])
+
+        # The first process already read the results and learns they are committed from the file
+        self.assertEqual(first.get_pending_score(self.user.pk), 0)
+        self.assertEqual(first.write_batch(10), 0)
+        self.assertEqual(GameSession.objects.filter(user=self.user).count(), 3)
+
+    def test_committed_results_are_not_written_again(self):
+        first, second = GameResultSpool(self.path), GameResultSpool(self.path)
+        self.append(first, 10)
+        self.append(first, 20)
+        self.assertEqual(second.get_pending_score(self.user.pk), 30)
+
+        self.assertEqual(first.write_batch(1), 1)
+        # The second process read both results before the first one was committed
+        with mock.patch.object(second, "_read_file"):
+            self.assertEqual(second.write_batch(10), 2)
+        self.assertEqual(self.get_sessions(), [10, 20])
+
+    def test_spool_is_compacted(self):
+        spool = GameResultSpool(self.path)
+        for score in (10, 20, 30):
+            self.append(spool, score)
+
+        spool.write_batch(2)
+        records = [json.loads(line) for line in self.path.read_text().splitlines()]
+        self.assertEqual([(record["sequence"], record.get("session")) for record in records], [
+            (2, None),
+            (3, {"game": "memory", "wordset": self.wordset.pk, "score": 30, "duration": 0}),
+        ])
+
+        # A restarted process continues from the compacted file
+        restarted = GameResultSpool(self.path)
+        self.append(restarted, 40)
+        self.assertEqual(restarted.get_pending_score(self.user.pk), 70)
+        self.assertEqual(json.loads(self.path.read_text().splitlines()[-1])["sequence"], 4)
+
+    def test_line_cut_short_by_a_crash_is_skipped(self):
+        spool = GameResultSpool(self.path)
+        self.append(spool, 10)
+        with open(self.path, "a") as file:
+            file.write('{"sequence": 2, "user"')
+
+        restarted = GameResultSpool(self.path)
+        self.append(restarted, 20)
+        self.assertEqual(restarted.write_batch(10), 2)
+        self.assertEqual(self.get_sessions(), [10, 20])
+
+    def test_score_out_of_range_is_not_spooled(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        body = {"wordset": self.wordset.pk, "score": MAX_INTEGER + 1, "duration": 10}
+        with override_settings(GAME_RESULTS_WRITE_BEHIND=True), \
+                mock.patch("api.views.enqueue_game_result") as enqueue_game_result:
+            response = client.post("/memory-game/", body, format="json")
+        self.assertEqual(response.status_code, 400)
+        enqueue_game_result.assert_not_called()
+
+    def test_result_refused_by_the_database_is_rejected(self):
+        spool = GameResultSpool(self.path)
+        CustomUser.objects.filter(pk=self.user.pk).update(score=MAX_INTEGER - 15)
+        other = CustomUser.objects.create_user("other", password="other")
+        self.append(spool, 10)
+        self.append(spool, 10)
+        spool.append(other.pk, {"game": "memory", "wordset": self.wordset.pk, "score": 5, "duration": 0})
+        self.append(spool, MAX_INTEGER + 1)
+
+        self.assertEqual(spool.write_batch(10), 4)
+        # The second result overflows the user's score, the others are written
+        self.assertEqual(self.get_sessions(), [10])
+        self.assertEqual(GameSession.objects.filter(user=other).count(), 1)
+        rejected = [json.loads(line) for line in open(spool.rejected_path)]
+        self.assertEqual([entry["record"]["sequence"] for entry in rejected], [2, 4])
+        self.assertEqual(spool.write_batch(10), 0)
+
+    def test_result_counts_in_the_week_it_was_played(self):
+        spool = GameResultSpool(self.path)
+        sunday_evening = datetime(2024, 3, 10, 23, 50, tzinfo=ZoneInfo("UTC"))
+        with mock.patch("django.utils.timezone.now", return_value=sunday_evening):
+            self.append(spool, 10)
+
+        with mock.patch("django.utils.timezone.now", return_value=sunday_evening + timedelta(minutes=20)):
+            spool.write_batch(10)
+        weeks = self.user.leaderboard_entries.filter(period=LeaderboardPeriod.WEEK)
+        self.assertEqual(list(weeks.values_list("period_start", "points")), [(date(2024, 3, 4), 10)])
+
+
+class PartitionCommandsTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user("partitions", password="partitions")
+        self.month = add_months(get_month_start(timezone.now()), -24)
+        self.partition = get_partition_name("api_scorehistory", self.month)
+
+    def test_old_month_is_partitioned_and_archived(self):
+        history = ScoreHistory.objects.create(user=self.user, date=self.month + timedelta(days=3), game_name="memory",
+                                              score_gained=10)
+        call_command("manage_partitions", stdout=StringIO())
+        with connection.cursor() as cursor:
+            self.assertIn((self.partition, self.month), get_partitions(cursor, "api_scorehistory"))
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            call_command("archive_partitions", output_dir, stdout=StringIO())
+            with gzip.open(Path(output_dir) / f"{self.partition}.csv.gz", "rt") as file:
+                rows = list(csv.DictReader(file))
+
+        self.assertEqual([(int(row["id"]), row["score_gained"]) for row in rows], [(history.pk, "10")])
+        self.assertFalse(ScoreHistory.objects.filter(pk=history.pk).exists())
+        with connection.cursor() as cursor:
+            self.assertNotIn(self.partition, [name for name, _ in get_partitions(cursor, "api_scorehistory")])
+
+
+class GameSessionMigrationTest(TransactionTestCase):
+    before = [("api", "0044_partition_game_history")]
+    after = [("api", "0045_gamesession")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationLoader(connection).graph.leaf_nodes())
+
+    def test_sessions_of_all_games_are_numbered_anew(self):
+        old_apps = self.migrate(self.before)
+        user = old_apps.get_model("api", "CustomUser").objects.create(username="migrated")
+        opponent = old_apps.get_model("api", "CustomUser").objects.create(username="opponent")
+        wordset = old_apps.get_model("api", "WordSet").objects.create(english="migrated", polish="migrated")
+        start = timezone.now() - timedelta(days=1)
+        memory = old_apps.get_model("api", "MemoryGameSession").objects.create(
+            user=user, wordset=wordset, score=1, timestamp=start + timedelta(minutes=2))
+        race = old_apps.get_model("api", "RaceGameSession").objects.create(
+            user=user, wordset=wordset, score=2, timestamp=start + timedelta(minutes=1))
+        race.opponents.add(opponent)
+        # Ids of different games overlap
+        self.assertEqual(memory.pk, race.pk)
+
+        new_apps = self.migrate(self.after)
+        sessions = new_apps.get_model("api", "GameSession").objects.order_by("id")
+        self.assertEqual(list(sessions.values_list("game_name", "score")), [("race", 2), ("memory", 1)])
+        self.assertEqual(list(sessions.first().opponents.values_list("username", flat=True)), ["opponent"])
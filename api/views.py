@@ -1,47 +1,64 @@
 # views.py
 import json
 import uuid
+from django.conf import settings
 from django.core.files.storage import default_storage
-from django.db.models.functions import Coalesce
-from django.http import HttpResponseBadRequest
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseBadRequest
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action, api_view, permission_classes, parser_classes
 from rest_framework.exceptions import ValidationError
+from api.catalogue import get_translation_catalogue
 from api.consumers.updates_consumer import UpdatesConsumer, send_update
-from api.helpers import calculate_current_week_start
-from django.db.models import OuterRef, Subquery, Sum, Value, IntegerField, ExpressionWrapper
+from api.helpers import calculate_current_week_start, is_integer
+from api.game_sessions import MAX_SUBMITTED_SESSIONS, SINGLE_PLAYER_GAMES, get_game_session_rows, \
+    submit_game_sessions, validate_session_submission
+from api.pagination import OptionalCursorPagination
+from api.ranking import RankedScores
+from api.search import autocomplete_translations, search_translations
+from api.scoreboard import Leaderboard, get_archived_user_result, rank_scores
+from api.wordset_unlocks import evaluate_wordset_unlocks
+from api.write_behind import enqueue_game_result, is_write_behind_enabled
+from api.statistics import ACTIVITY_GRANULARITIES, cached_statistics, get_activity_counts, get_activity_days, \
+    get_dashboard, get_user_streaks
 from api.serializers import (
     TranslationSerializer,
     MemoryGameSessionSerializer, FallingWordsGameSessionSerializer, FriendRequestSerializer,
-    FriendshipSerializer, WordSetSerializer, WordSetWithTranslationSerializer
+    FriendshipSerializer, WordSetSerializer
 )
 from api.models import CustomUser, Translation, WordSet, MemoryGameSession, FallingWordsGameSession, FriendRequest, \
-    Friendship, ScoreHistory, GAME_NAMES_MODELS_MAPPING
+    Friendship, WeeklyScoreboardSnapshot, GAME_NAMES_MODELS_MAPPING
 from rest_framework import status
 from rest_framework.parsers import FileUploadParser
 from rest_framework.response import Response
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+DEFAULT_SEARCH_RESULTS = 20
+MAX_SEARCH_RESULTS = 100
 
 
 class TranslationViewSet(viewsets.ModelViewSet):
     queryset = Translation.objects.all()
     serializer_class = TranslationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalCursorPagination
+
+    def get_queryset(self):
+        return Translation.with_star_for_user(self.request.user).order_by('id')
 
     @action(detail=True, methods=["put"])
     def toggle_star(self, request, pk=None):
         translation = self.get_object()
         user = request.user
 
-        if translation.starred_by.filter(id=user.id).exists():
+        if translation.star:
             translation.starred_by.remove(user)
         else:
             translation.starred_by.add(user)
-        translation.save()
 
-        translation.refresh_from_db()
-
-        star = translation.starred_by.filter(id=user.id).exists()
+        star = not translation.star
 
         return Response({
             'id': translation.id,
@@ -50,34 +67,55 @@ class TranslationViewSet(viewsets.ModelViewSet):
             'star': star
         })
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        user = request.user
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        return self.get_matching_translations(request, search_translations)
 
-        serialized_data = []
-        for translation in queryset:
-            star = translation.starred_by.filter(id=user.id).exists()
-            serialized_data.append({
-                'id': translation.id,
-                'english': translation.english,
-                'polish': translation.polish,
-                'star': star,
-            })
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        return self.get_matching_translations(request, autocomplete_translations)
+
+    def get_matching_translations(self, request, match):
+        text = request.query_params.get("q", "")
+        wordset = request.query_params.get("wordset")
+        starred = request.query_params.get("starred") == "true"
+
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", DEFAULT_SEARCH_RESULTS)), MAX_SEARCH_RESULTS))
+            wordset = int(wordset) if wordset else None
+        except ValueError:
+            return HttpResponseBadRequest("Parameters 'limit' and 'wordset' must be integers.")
+
+        translations = self.get_queryset()
+        if wordset is not None:
+            translations = translations.filter(wordset=wordset)
+        if starred:
+            translations = translations.filter(star=True)
+
+        serializer = self.get_serializer(match(translations, text)[:limit], many=True)
+        return Response(serializer.data)
 
-        return Response(serialized_data)
+    @action(detail=False, methods=["put"])
+    def bulk_star(self, request):
+        body = json.loads(request.body)
+        ids, star = body.get("ids"), body.get("star")
 
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        user = request.user
+        if not isinstance(ids, list) or not all(is_integer(pk) for pk in ids) or not isinstance(star, bool):
+            return HttpResponseBadRequest("Body must contain a list of translation 'ids' and a boolean 'star'.")
 
-        star = instance.starred_by.filter(id=user.id).exists()
+        user = request.user
+        stars = Translation.starred_by.through
+        with transaction.atomic():
+            translation_ids = list(Translation.objects.filter(pk__in=ids).values_list('id', flat=True))
+            if star:
+                stars.objects.bulk_create(
+                    [stars(translation_id=translation_id, customuser=user) for translation_id in translation_ids],
+                    ignore_conflicts=True,
+                )
+            else:
+                stars.objects.filter(translation_id__in=translation_ids, customuser=user).delete()
 
-        return Response({
-            'id': instance.id,
-            'english': instance.english,
-            'polish': instance.polish,
-            'star': star,
-        })
+        return Response({'ids': sorted(translation_ids), 'star': star})
 
 
 class WordSetReadOnlySet(viewsets.ReadOnlyModelViewSet):
@@ -87,12 +125,12 @@ class WordSetReadOnlySet(viewsets.ReadOnlyModelViewSet):
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        serializer = WordSetSerializer(instance, context={'request': request})
+        serializer = WordSetSerializer(instance, context=self.get_serializer_context())
         return Response(serializer.data)
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
-        serializer = WordSetSerializer(queryset, many=True, context={'request': request})
+        serializer = WordSetSerializer(queryset, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
     @action(detail=True, methods=["get"])
@@ -103,20 +141,70 @@ class WordSetReadOnlySet(viewsets.ReadOnlyModelViewSet):
         if not wordset:
             return Response(status=status.HTTP_404_NOT_FOUND, data={'message': "Wordset not found."})
 
-        serialized_data = WordSetWithTranslationSerializer(wordset, context={'request': request}).data
-
-        if serialized_data.get('locked'):
+        if evaluate_wordset_unlocks(request.user)[wordset.pk].locked:
             return Response(status=status.HTTP_403_FORBIDDEN, data={'message': "Wordset is locked."})
 
+        words = Translation.with_star_for_user(request.user, wordset.words.all())
         if limit:
-            serialized_data['words'] = serialized_data['words'][:int(limit)]
+            words = words[:int(limit)]
+
+        serializer = TranslationSerializer(words, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
 
-        return Response(serialized_data.get('words'))
+    @action(detail=True, methods=["get"])
+    def bundle(self, request, pk=None):
+        # Unversioned URL, clients revalidate it with the ETag
+        return self.get_bundle_response(request, "private, no-cache")
+
+    @action(detail=True, methods=["get"], url_path=r"bundle/(?P<content_hash>[0-9a-f]{64})")
+    def versioned_bundle(self, request, pk=None, content_hash=None):
+        return self.get_bundle_response(request, "private, max-age=31536000, immutable", content_hash)
+
+    @action(detail=True, methods=["get"])
+    def user_state(self, request, pk=None):
+        wordset = self.get_object()
+        words = get_translation_catalogue().get_wordset(wordset.pk)
+        unlock_state = evaluate_wordset_unlocks(request.user)[wordset.pk]
+        starred = Translation.starred_by.through.objects.filter(
+            customuser=request.user, translation_id__in=words.ids).values_list('translation_id', flat=True)
+
+        return Response({
+            'bundle': words.get_bundle().content_hash,
+            'locked': unlock_state.locked,
+            'points': unlock_state.points,
+            'starred': sorted(starred),
+        })
+
+    def get_bundle_response(self, request, cache_control, content_hash=None):
+        wordset = self.get_object()
+        if evaluate_wordset_unlocks(request.user)[wordset.pk].locked:
+            return Response(status=status.HTTP_403_FORBIDDEN, data={'message': "Wordset is locked."})
+
+        bundle = get_translation_catalogue().get_wordset(wordset.pk).get_bundle()
+        if content_hash is not None and content_hash != bundle.content_hash:
+            return Response(status=status.HTTP_404_NOT_FOUND, data={'message': "Bundle version is no longer available."})
+
+        # Both bodies are strongly validated, so each encoding gets its own tag
+        gzipped = "gzip" in request.headers.get("Accept-Encoding", "")
+        etag = f'"{bundle.content_hash}-gzip"' if gzipped else f'"{bundle.content_hash}"'
+        if etag in [tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")]:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        elif gzipped:
+            response = HttpResponse(bundle.compressed, content_type="application/json")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(bundle.decompress(), content_type="application/json")
+
+        response["ETag"] = etag
+        response["Cache-Control"] = cache_control
+        response["Vary"] = "Accept-Encoding"
+        return response
 
 
 class BaseGameSessionViewSet(viewsets.ModelViewSet):
     http_method_names = ["get", "post", "head", "options"]
     permission_classes = [permissions.IsAuthenticated]
+    game_name = None
 
     def get_queryset(self):
         wordset = self.request.query_params.get("wordset", None)
@@ -128,6 +216,9 @@ class BaseGameSessionViewSet(viewsets.ModelViewSet):
         user = request.user
 
         body = json.loads(request.body)
+        if is_write_behind_enabled() and self.game_name in SINGLE_PLAYER_GAMES:
+            return self.enqueue(user, body)
+
         wordset = WordSet.objects.get(pk=body["wordset"])
 
         timestamp = datetime.fromtimestamp(
@@ -148,17 +239,40 @@ class BaseGameSessionViewSet(viewsets.ModelViewSet):
         serializer = self.serializer_class(instance)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def enqueue(self, user, body):
+        """
+        Spools the session to be saved by the write-behind writer. The
+        session is durable once this returns, it shows up in the history
+        after the next batch is written.
+        """
+        submission = {
+            "game": self.game_name,
+            "wordset": body.get("wordset"),
+            "score": body.get("score"),
+            "duration": body.get("duration", 0),
+        }
+        wordset_exists = is_integer(submission["wordset"]) and \
+            WordSet.objects.filter(pk=submission["wordset"]).exists()
+        errors = validate_session_submission(submission, [submission["wordset"]] if wordset_exists else [])
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        enqueue_game_result(user, submission)
+        return Response(submission, status=status.HTTP_202_ACCEPTED)
+
 
 class MemoryGameSessionViewSet(BaseGameSessionViewSet):
     queryset = MemoryGameSession.objects.all()
     serializer_class = MemoryGameSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    game_name = "memory"
 
 
 class FallingWordsSessionViewSet(BaseGameSessionViewSet):
     queryset = FallingWordsGameSession.objects.all()
     serializer_class = FallingWordsGameSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    game_name = "falling_words"
 
 
 @api_view(["POST"])
@@ -185,38 +299,6 @@ def uploadAvatar(request):
     return Response(status=status.HTTP_200_OK)
 
 
-def get_points_history_aggregate(agg):
-    return ExpressionWrapper(
-        Coalesce(Subquery(
-            ScoreHistory.objects
-            .filter(user=OuterRef('pk'))
-            .values('user')
-            .annotate(score=agg)
-            .values('score')
-        ), Value(0)),
-        output_field=IntegerField()
-    )
-
-
-
-def get_game_sessions(user, game, start_date, end_date):
-    if game in GAME_NAMES_MODELS_MAPPING.keys():
-        game_model = GAME_NAMES_MODELS_MAPPING.get(game)
-        if game_model:
-            return game_model.objects.filter(user=user, timestamp__range=(start_date, end_date)) if start_date else game_model.objects.filter(user=user)
-        else:
-            return -1
-    elif game == "all_games":
-        # Sum all stats from all games
-        game_sessions = []
-        game_models = GAME_NAMES_MODELS_MAPPING.values()
-        for model in game_models:
-            game_sessions.extend(model.objects.filter(user=user, timestamp__range=(start_date, end_date)) if start_date else model.objects.filter(user=user))
-        return game_sessions
-    else:
-        return -1
-
-
 @api_view(['POST'])
 @permission_classes((permissions.IsAuthenticated,))
 def get_scoreboard(request):
@@ -229,63 +311,104 @@ def get_scoreboard(request):
             f"Body must contain 'period'. Body received: {body},"
         )
 
-    objects = ScoreHistory.objects
+    around = body.get("around")
+    if around is not None and (not is_integer(around) or around < 0):
+        return HttpResponseBadRequest("'around' must be a non-negative integer.")
 
-    if period == "all_time":
-        pass
-    elif period == "this_week":
-        start_of_the_week = calculate_current_week_start()
-        objects = objects.filter(date__gte=start_of_the_week)
-    else:
+    leaderboard = Leaderboard.for_period(period)
+    if leaderboard is None:
         return HttpResponseBadRequest("Unknown period type. Available periods: 'this_week', 'all_time'. ")
 
-    agg = Sum("score_gained", default=0)
-
-    all_scores = None
     if scoreboard_type == "global":
-        all_scores = (
-            CustomUser.objects
-            .annotate(points=get_points_history_aggregate(agg))
-            .values('username', 'points')
-            .order_by("-points")
-        )
+        user_ids = None
     elif scoreboard_type == "friends":
         friends = Friendship.objects.filter(user=request.user).values_list('friend', flat=True)
-        friends_and_user = list(friends) + [request.user.id]
-
-        all_scores = (
-            CustomUser.objects
-            .filter(pk__in=friends_and_user)
-            .annotate(points=get_points_history_aggregate(agg))
-            .values('username', 'points')
-            .order_by("-points")
-        )
+        user_ids = list(friends) + [request.user.id]
     else:
         return HttpResponseBadRequest("Unknown scoreboard type. Available types: 'friends', 'global")
 
-    ranked_scores = []
-    current_place = 1
-    previous_score = None
-    for score in all_scores:
-        if previous_score is not None and score["points"] < previous_score["points"]:
-            current_place += 1
-        ranked_scores.append({"place": current_place, **score})
-        previous_score = score
+    # Scope selects what the points are counted for: everything, a single game or a single wordset
+    scope = body.get("scope", "overall")
+    since = calculate_current_week_start() if period == "this_week" else None
+    if scope == "overall" and user_ids is None:
+        top_100_places = leaderboard.get_top_places()
+        user_result = leaderboard.get_user_result(request.user)
+        around_places = leaderboard.get_entries_around(request.user, around) if around is not None else None
+    else:
+        if scope == "overall":
+            ranked_scores = RankedScores.from_queryset(leaderboard.get_scores_for_users(user_ids))
+        elif scope == "game":
+            game = body.get("game")
+            if game not in GAME_NAMES_MODELS_MAPPING:
+                return HttpResponseBadRequest(
+                    "Invalid game name. Valid game names are: " + ", ".join(GAME_NAMES_MODELS_MAPPING.keys()))
+            ranked_scores = RankedScores.for_game(game, since, user_ids)
+        elif scope == "wordset":
+            wordset = WordSet.objects.filter(pk=body.get("wordset")).first()
+            if not wordset:
+                return Response(status=status.HTTP_404_NOT_FOUND, data={'message': "Wordset not found."})
+            ranked_scores = RankedScores.for_wordset(wordset, since, user_ids)
+        else:
+            return HttpResponseBadRequest("Unknown scope. Available scopes: 'overall', 'game', 'wordset'.")
+
+        top_100_places = ranked_scores.get_places(1, 100)
+        user_result = ranked_scores.get_user_result(request.user)
+        around_places = ranked_scores.get_around(request.user, around) if around is not None else None
+
+    data = {"user": user_result, "top_100": top_100_places}
+    if around_places is not None:
+        data["around"] = around_places
+    return Response(data=data)
 
-    user_result = next((score for score in ranked_scores if score["username"] == request.user.username), None)
-    if scoreboard_type == "friends":
-        user_score = ScoreHistory.objects.filter(user=request.user).aggregate(score=agg)["score"]
-        user_place = len(ranked_scores) + 1 if previous_score and user_score < previous_score[
-            "points"] else current_place
-        user_result = {"place": user_place, "username": request.user.username, "points": user_score}
 
-    top_100_places = [ranked_score for ranked_score in ranked_scores if ranked_score["place"] <= 100]
+@api_view(["GET", "POST"])
+@permission_classes((permissions.IsAuthenticated,))
+def get_scoreboard_history(request):
+    if request.method == "GET":
+        weeks = WeeklyScoreboardSnapshot.objects.order_by("-week_start").values_list("week_start", flat=True)
+        return Response(data={"weeks": [week.strftime("%Y-%m-%d") for week in weeks]})
+
+    body = json.loads(request.body)
+    scoreboard_type = body.get("scoreboard_type", "global")
+
+    try:
+        week_start = datetime.strptime(body.get("week_start", ""), "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return HttpResponseBadRequest("Body must contain 'week_start' in the YYYY-MM-DD format.")
 
-    return Response(data={"user": user_result, "top_100": top_100_places})
+    snapshot = WeeklyScoreboardSnapshot.objects.filter(week_start=week_start).first()
+    if not snapshot:
+        return Response(status=status.HTTP_404_NOT_FOUND, data={'message': "Scoreboard of this week is not archived."})
+
+    if scoreboard_type == "global":
+        top_100_places = [place for place in snapshot.top_places if place["place"] <= 100]
+        user_result = get_archived_user_result(snapshot, request.user)
+    elif scoreboard_type == "friends":
+        friends = Friendship.objects.filter(user=request.user).values_list('friend', flat=True)
+        friends_and_user = list(friends) + [request.user.id]
+
+        points_by_username = {
+            username: 0 for username in
+            CustomUser.objects.filter(pk__in=friends_and_user).values_list('username', flat=True)
+        }
+        points_by_username.update(
+            snapshot.places.filter(user__in=friends_and_user).values_list('user__username', 'points'))
+        ranked_scores = rank_scores(sorted(
+            ({"username": username, "points": points} for username, points in points_by_username.items()),
+            key=lambda score: (-score["points"], score["username"])
+        ))
+
+        user_result = next(score for score in ranked_scores if score["username"] == request.user.username)
+        top_100_places = [ranked_score for ranked_score in ranked_scores if ranked_score["place"] <= 100]
+    else:
+        return HttpResponseBadRequest("Unknown scoreboard type. Available types: 'friends', 'global")
+
+    return Response(data={"week_start": body["week_start"], "user": user_result, "top_100": top_100_places})
 
 
 @api_view(["POST"])
 @permission_classes((permissions.IsAuthenticated,))
+@cached_statistics
 def get_calendar_stats(request):
     user = request.user
     body = json.loads(request.body)
@@ -303,8 +426,8 @@ def get_calendar_stats(request):
     end_date = start_date.replace(day=1, month=start_date.month % 12 + 1,
                                   year=start_date.year + start_date.month // 12) - timedelta(days=1)
 
-    game_sessions = get_game_sessions(user, game, start_date, end_date)
-    if game_sessions == -1:
+    activity_days = get_activity_days(user, game)
+    if activity_days is None:
         return HttpResponseBadRequest(
             "Invalid game name. Valid game names are: " + ", ".join(GAME_NAMES_MODELS_MAPPING.keys()) + "or 'all_games'.")
 
@@ -312,58 +435,32 @@ def get_calendar_stats(request):
     all_days_str = [day.strftime("%d").lstrip('0') for day in all_days]
 
     results = {day: 0 for day in all_days_str}
-    for session in game_sessions:
-        created_day = session.timestamp.date()
-        created_day_str = created_day.strftime("%d").lstrip('0')
-        results[created_day_str] += 1
+    month_activity = activity_days.filter(day__range=(start_date.date(), end_date.date())).values_list("day", "sessions")
+    for day, sessions in month_activity:
+        results[str(day.day)] = sessions
 
     return Response(data={"calendar": results, "month": month, "year": year})
 
 
 @api_view(["POST"])
 @permission_classes((permissions.IsAuthenticated,))
+@cached_statistics
 def get_longest_streak(request):
     user = request.user
     body = json.loads(request.body)
     game = body.get("game", None)
 
-    end_date = datetime.today()
-
-    game_sessions = get_game_sessions(user, game, None, end_date)
-    if game_sessions == -1:
+    activity_days = get_activity_days(user, game)
+    if activity_days is None:
         return HttpResponseBadRequest(
             "Invalid game name. Valid game names are: " + ", ".join(GAME_NAMES_MODELS_MAPPING.keys()) + "or 'all_games'.")
 
-    if game_sessions:
-        game_sessions = sorted(game_sessions, key=lambda session: session.timestamp)
-        current_streak = 0
-        longest_streak = 0
-        current_streak_start = None
-        longest_streak_start = None
-        previous_date = None
-
-        for session in game_sessions:
-            current_date = session.timestamp.date()
-            if previous_date is None or (current_date - previous_date).days == 1:
-                if current_streak == 0:
-                    current_streak_start = current_date
-                current_streak += 1
-            else:
-                current_streak = 1
-                current_streak_start = current_date
-
-            if current_streak > longest_streak:
-                longest_streak = current_streak
-                longest_streak_start = current_streak_start
-
-            previous_date = current_date
-
-        longest_streak_end = longest_streak_start + timedelta(days=longest_streak - 1)
-
+    streaks = get_user_streaks(user, game, activity_days, date.today())
+    if streaks.longest:
         return Response({
-            "longest_streak": longest_streak,
-            "start_date": longest_streak_start.strftime("%Y-%m-%d"),
-            "end_date": longest_streak_end.strftime("%Y-%m-%d")
+            "longest_streak": streaks.longest,
+            "start_date": streaks.longest_start.strftime("%Y-%m-%d"),
+            "end_date": streaks.longest_end.strftime("%Y-%m-%d")
         })
     else:
         return HttpResponseBadRequest("Invalid input")
@@ -371,89 +468,120 @@ def get_longest_streak(request):
 
 @api_view(["POST"])
 @permission_classes((permissions.IsAuthenticated,))
+@cached_statistics
 def get_current_streak(request):
     user = request.user
     body = json.loads(request.body)
     game = body.get("game", None)
 
-    end_date = datetime.today()
-
-    game_sessions = get_game_sessions(user, game, None, end_date)
-    if game_sessions == -1:
+    activity_days = get_activity_days(user, game)
+    if activity_days is None:
         return HttpResponseBadRequest(
             "Invalid game name. Valid game names are: " + ", ".join(GAME_NAMES_MODELS_MAPPING.keys()))
 
-    if game_sessions:
-        timestamps = [session.timestamp.date() for session in game_sessions]
-        timestamps = list(set(timestamps))
-        timestamps.sort(reverse=True)
-
-        if datetime.today().date() not in timestamps:
-            return Response({"current_streak": 0})
+    streaks = get_user_streaks(user, game, activity_days, date.today())
+    return Response({"current_streak": streaks.current})
 
-        timestamps.pop(0)
-        current_streak = 1
-        prev_date = datetime.today().date()
 
-        for timestamp in timestamps:
-            if (prev_date - timestamp).days == 1:
-                current_streak += 1
-                prev_date = timestamp
-            else:
-                return Response({"current_streak": current_streak})
+@api_view(["GET"])
+@permission_classes((permissions.IsAuthenticated,))
+@cached_statistics
+def get_total_days(request):
+    user = request.user
 
-        return Response({"current_streak": current_streak})
+    days_with_at_least_one_session = get_activity_days(user, "all_games").count()
 
+    return Response({"total_days": days_with_at_least_one_session})
 
 
-@api_view(["GET"])
+@api_view(["POST"])
 @permission_classes((permissions.IsAuthenticated,))
-def get_total_days(request):
+@cached_statistics
+def get_game_points(request):
     user = request.user
+    body = json.loads(request.body)
+    game = body.get("game", None)
 
-    end_date = datetime.today()
-
-    game_sessions = get_game_sessions(user, "all_games", None, end_date)
-    if game_sessions == -1:
+    game_sessions = get_game_session_rows(game, ("score",), user=user)
+    if game_sessions is None:
         return HttpResponseBadRequest(
-            "Invalid game name. Valid game names are: " + ", ".join(
-                GAME_NAMES_MODELS_MAPPING.keys()) + "or 'all_games'.")
+            "Invalid game name. Valid game names are: " + ", ".join(GAME_NAMES_MODELS_MAPPING.keys()) + "or 'all_games'.")
+
+    total_points = game_sessions.sum("score")
 
-    if game_sessions:
-        game_sessions = sorted(game_sessions, key=lambda session: session.timestamp)
+    return Response({"total_points": total_points})
 
-        session_count_per_day = {}
-        for session in game_sessions:
-            day = session.timestamp.date()
-            session_count_per_day[day] = session_count_per_day.get(day, 0) + 1
 
-        days_with_at_least_one_session = sum(count >= 1 for count in session_count_per_day.values())
+@api_view(["POST"])
+@permission_classes((permissions.IsAuthenticated,))
+@cached_statistics
+def get_dashboard_stats(request):
+    body = json.loads(request.body)
+    widgets = body.get("widgets")
 
-        return Response({"total_days": days_with_at_least_one_session})
+    if not isinstance(widgets, dict) or not all(isinstance(params, (dict, type(None))) for params in widgets.values()):
+        return HttpResponseBadRequest("Body must contain 'widgets' mapping widget names to their parameters.")
 
-    return Response({"total_days": 0})
+    try:
+        dashboard = get_dashboard(request.user, widgets, date.today())
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+
+    return Response(dashboard)
 
 
 @api_view(["POST"])
 @permission_classes((permissions.IsAuthenticated,))
-def get_game_points(request):
-    user = request.user
+@cached_statistics
+def get_activity_stats(request):
     body = json.loads(request.body)
-    game = body.get("game", None)
-
-    end_date = datetime.today()
+    game = body.get("game", "all_games")
+    granularity = body.get("granularity", "day")
 
-    game_sessions = get_game_sessions(user, game, None, end_date)
-    if game_sessions == -1:
+    if game != "all_games" and game not in GAME_NAMES_MODELS_MAPPING:
         return HttpResponseBadRequest(
             "Invalid game name. Valid game names are: " + ", ".join(GAME_NAMES_MODELS_MAPPING.keys()) + "or 'all_games'.")
+    if granularity not in ACTIVITY_GRANULARITIES:
+        return HttpResponseBadRequest(
+            "Invalid granularity. Valid granularities are: " + ", ".join(ACTIVITY_GRANULARITIES.keys()))
 
-    total_points = 0
-    if game_sessions:
-        for session in game_sessions:
-            total_points += session.score
+    try:
+        tzinfo = ZoneInfo(body.get("timezone", settings.TIME_ZONE))
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return HttpResponseBadRequest("Invalid time zone.")
 
-    return Response({"total_points": total_points})
+    try:
+        end_date = date.fromisoformat(body["end"]) if "end" in body else datetime.now(tzinfo).date()
+        start_date = date.fromisoformat(body["start"]) if "start" in body else end_date - timedelta(days=364)
+    except (ValueError, TypeError):
+        return HttpResponseBadRequest("Invalid date. Dates should be in the YYYY-MM-DD format.")
+
+    if start_date > end_date:
+        return HttpResponseBadRequest("Start date must not be after the end date.")
+
+    try:
+        first_bucket, counts = get_activity_counts(request.user, game, start_date, end_date, granularity, tzinfo)
+    except ValueError as error:
+        return HttpResponseBadRequest(str(error))
+
+    return Response({"start": first_bucket.strftime("%Y-%m-%d"), "granularity": granularity, "counts": counts})
+
+
+@api_view(["POST"])
+@permission_classes((permissions.IsAuthenticated,))
+def submit_game_sessions_batch(request):
+    body = json.loads(request.body)
+    sessions = body.get("sessions")
+
+    if not isinstance(sessions, list) or not sessions:
+        return HttpResponseBadRequest("Body must contain a non-empty list of 'sessions'.")
+    if len(sessions) > MAX_SUBMITTED_SESSIONS:
+        return HttpResponseBadRequest(f"At most {MAX_SUBMITTED_SESSIONS} sessions can be submitted at once.")
+
+    results = submit_game_sessions(request.user, sessions)
+    if not any(result["status"] == "created" for result in results):
+        return Response({"results": results}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({"results": results}, status=status.HTTP_201_CREATED)
 
 
 class FriendRequestViewSet(viewsets.ModelViewSet):
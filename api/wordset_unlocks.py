@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from itertools import groupby
+from operator import attrgetter
+from typing import Dict, List
+
+from api.models import WordSet, WordSetProgress
+
+
+@dataclass
+class WordSetUnlockState:
+    points: int
+    locked: bool
+    depends_on: List[WordSet]
+
+
+def evaluate_wordset_unlocks(user) -> Dict[int, WordSetUnlockState]:
+    """
+    Returns points, lock state and easier wordsets of every wordset for the
+    user, keyed by wordset id. The catalogue and the user's progress are read
+    with two queries and each category is walked once in difficulty order:
+    a wordset is locked while any easier wordset of its category is not
+    unlocked.
+    """
+    wordsets = WordSet.objects.order_by("category", "difficulty", "pk")
+    progress = {
+        wordset_id: (points, unlocked)
+        for wordset_id, points, unlocked in
+        WordSetProgress.objects.filter(user=user).values_list("wordset_id", "points", "unlocked")
+    }
+
+    states = {}
+    for _, category_wordsets in groupby(wordsets, key=attrgetter("category")):
+        easier_wordsets = []
+        easier_unlocked = True
+        for _, same_difficulty in groupby(category_wordsets, key=attrgetter("difficulty")):
+            same_difficulty = list(same_difficulty)
+            for wordset in same_difficulty:
+                points, _ = progress.get(wordset.pk, (0, False))
+                states[wordset.pk] = WordSetUnlockState(points, not easier_unlocked, easier_wordsets)
+
+            easier_unlocked = easier_unlocked and all(
+                progress.get(wordset.pk, (0, False))[1] for wordset in same_difficulty)
+            easier_wordsets = easier_wordsets + same_difficulty
+
+    return states
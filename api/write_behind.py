@@ -0,0 +1,299 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from api.game_sessions import submit_game_sessions
+from api.models import CustomUser, GameResultSpoolCheckpoint
+
+logger = logging.getLogger(__name__)
+
+SPOOL_NAME = "game_results"
+
+
+def get_played_at(record):
+    # Results spooled by older versions have no time, they count as played now
+    if "played_at" not in record:
+        return timezone.now()
+    return datetime.fromisoformat(record["played_at"])
+
+
+class GameResultSpool:
+    """
+    Durable queue of finished single-player games. Results are appended to
+    a local file (one JSON line each, fsynced before the request returns),
+    so they survive a restart. Every result gets a sequence number, the
+    database checkpoint records the last committed one, so results are
+    written exactly once even when the file is replayed.
+
+    Processes sharing the file take turns through a lock file. Each reads
+    the lines others appended before touching the spool, so sequence numbers
+    stay unique and any writer can commit any result. Once results are
+    committed the file is compacted to the ones that are not, behind a line
+    holding the checkpoint.
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self.lock_path = f"{self.path}.lock"
+        self.rejected_path = f"{self.path}.rejected"
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._checkpoint = 0
+        self._last_sequence = 0
+        self._file_id = None
+        self._offset = 0
+        self._pending = []
+        self._pending_scores = defaultdict(int)
+        self._records_available = threading.Event()
+
+    def append(self, user_id, submission):
+        with self._locked():
+            self._last_sequence += 1
+            record = {"sequence": self._last_sequence, "user": user_id, "played_at": timezone.now().isoformat(),
+                      "session": submission}
+            with open(self.path, "ab") as file:
+                stat = os.fstat(file.fileno())
+                if (stat.st_dev, stat.st_ino) != self._file_id:
+                    self._file_id, self._offset = (stat.st_dev, stat.st_ino), 0
+                # A line cut short by a crash must not swallow this one
+                line = (b"\n" if stat.st_size != self._offset else b"") + json.dumps(record).encode() + b"\n"
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+            self._offset = stat.st_size + len(line)
+            self._add_pending(record)
+        self._records_available.set()
+
+    def get_pending_score(self, user_id):
+        """
+        Score of the user's spooled results that are not in the database yet.
+        """
+        with self._locked():
+            return self._pending_scores.get(user_id, 0)
+
+    def write_batch(self, max_records):
+        """
+        Writes up to `max_records` spooled results to the database in one
+        transaction, advances the checkpoint and compacts the file. Returns
+        the number of results taken off the spool.
+        """
+        with self._locked():
+            batch = self._pending[:max_records]
+        if not batch:
+            return 0
+
+        rejected = []
+        with transaction.atomic():
+            checkpoint = GameResultSpoolCheckpoint.objects.select_for_update().get(name=SPOOL_NAME)
+            # Another process may have committed some of them since they were read
+            records_by_user = defaultdict(list)
+            for record in batch:
+                if record["sequence"] > checkpoint.last_sequence:
+                    records_by_user[record["user"]].append(record)
+
+            users = CustomUser.objects.in_bulk(records_by_user.keys())
+            for user_id, records in records_by_user.items():
+                if user_id in users:
+                    rejected += self._write_records(users[user_id], records)
+                else:
+                    rejected += [(record, "User does not exist.") for record in records]
+            checkpoint.last_sequence = max(checkpoint.last_sequence, batch[-1]["sequence"])
+            checkpoint.save(update_fields=["last_sequence"])
+
+        with self._locked():
+            self._set_checkpoint(checkpoint.last_sequence)
+            self._compact()
+            self._reject(rejected)
+        return len(batch)
+
+    def _write_records(self, user, records):
+        """
+        Writes spooled results of the user. When the database refuses them,
+        they are retried one by one, so a single bad result is set aside
+        instead of holding up every result spooled after it. Returns the
+        rejected results with the reason.
+        """
+        try:
+            with transaction.atomic():
+                results = submit_game_sessions(user, [record["session"] for record in records],
+                                               [get_played_at(record) for record in records])
+        except (DataError, IntegrityError) as error:
+            if len(records) == 1:
+                return [(records[0], str(error))]
+            return [rejected for record in records for rejected in self._write_records(user, [record])]
+
+        return [(record, result["errors"]) for record, result in zip(records, results) if result["status"] != "created"]
+
+    def _reject(self, rejected):
+        """
+        Moves results that can't be written to the rejected file next to the
+        spool, where they can be inspected and fixed up by hand.
+        """
+        if not rejected:
+            return
+
+        with open(self.rejected_path, "ab") as file:
+            for record, reason in rejected:
+                logger.warning("Rejected spooled result %s of user %s: %s", record["sequence"], record["user"], reason)
+                file.write(json.dumps({"record": record, "reason": reason}).encode() + b"\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def wait_for_records(self, timeout):
+        self._records_available.wait(timeout)
+        self._records_available.clear()
+
+    @contextmanager
+    def _locked(self):
+        """
+        Holds the spool for this thread and, with the lock file, for this
+        process, after reading what other processes wrote to the file.
+        """
+        with self._lock:
+            self._load()
+            with open(self.lock_path, "a") as lock_file:
+                # Released when the file is closed
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._read_file()
+                yield
+
+    def _load(self):
+        if self._loaded:
+            return
+
+        checkpoint, _ = GameResultSpoolCheckpoint.objects.get_or_create(name=SPOOL_NAME)
+        self._checkpoint = self._last_sequence = checkpoint.last_sequence
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._loaded = True
+
+    def _read_file(self):
+        """
+        Reads the lines added since the last read, including results that
+        were spooled but not committed before a restart.
+        """
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+
+        with file:
+            stat = os.fstat(file.fileno())
+            if (stat.st_dev, stat.st_ino) != self._file_id:
+                # A new or compacted file holds every result that is not committed
+                self._file_id, self._offset = (stat.st_dev, stat.st_ino), 0
+                self._pending.clear()
+                self._pending_scores.clear()
+
+            file.seek(self._offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    # Cut short by a crash, never acknowledged
+                    break
+                self._offset += len(line)
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._last_sequence = max(self._last_sequence, record["sequence"])
+                if "session" not in record:
+                    self._set_checkpoint(record["sequence"])
+                elif record["sequence"] > self._checkpoint:
+                    self._add_pending(record)
+
+    def _set_checkpoint(self, sequence):
+        if sequence <= self._checkpoint:
+            return
+
+        self._checkpoint = sequence
+        committed = [record for record in self._pending if record["sequence"] <= sequence]
+        del self._pending[:len(committed)]
+        for record in committed:
+            self._pending_scores[record["user"]] -= record["session"]["score"]
+            if not self._pending_scores[record["user"]]:
+                del self._pending_scores[record["user"]]
+
+    def _compact(self):
+        """
+        Replaces the file with one holding the checkpoint and the results
+        that are not committed yet, so it doesn't grow while results keep
+        coming.
+        """
+        lines = [{"sequence": self._checkpoint}] + self._pending
+        compacted_path = f"{self.path}.compacted"
+        with open(compacted_path, "wb") as file:
+            for record in lines:
+                file.write(json.dumps(record).encode() + b"\n")
+            file.flush()
+            os.fsync(file.fileno())
+            stat = os.fstat(file.fileno())
+        os.replace(compacted_path, self.path)
+        directory = os.open(os.path.dirname(self.path), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        self._file_id, self._offset = (stat.st_dev, stat.st_ino), stat.st_size
+
+    def _add_pending(self, record):
+        self._pending.append(record)
+        self._pending_scores[record["user"]] += record["session"]["score"]
+
+
+class GameResultWriter(threading.Thread):
+    """
+    Background thread committing spooled results in batches.
+    """
+
+    def __init__(self, spool, batch_size, interval):
+        super().__init__(name="game-result-writer", daemon=True)
+        self.spool = spool
+        self.batch_size = batch_size
+        self.interval = interval
+
+    def run(self):
+        while True:
+            self.spool.wait_for_records(self.interval)
+            close_old_connections()
+            try:
+                while self.spool.write_batch(self.batch_size) == self.batch_size:
+                    pass
+            except Exception:
+                logger.exception("Writing spooled game results failed, retrying later")
+
+
+game_result_spool = GameResultSpool(settings.GAME_RESULTS_SPOOL_PATH)
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def is_write_behind_enabled():
+    return settings.GAME_RESULTS_WRITE_BEHIND
+
+
+def start_game_result_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = GameResultWriter(game_result_spool, settings.GAME_RESULTS_WRITE_BATCH_SIZE,
+                                       settings.GAME_RESULTS_WRITE_INTERVAL)
+            _writer.start()
+
+
+def enqueue_game_result(user, submission):
+    start_game_result_writer()
+    game_result_spool.append(user.pk, submission)
+
+
+def get_pending_score(user):
+    if not is_write_behind_enabled():
+        return 0
+    return game_result_spool.get_pending_score(user.pk)
@@ -18,6 +18,7 @@ from django.core.asgi import get_asgi_application
 from django.urls import path
 
 from api.consumers import finding_words_consumer, race_consumer, updates_consumer
+from api.write_behind import is_write_behind_enabled, start_game_result_writer
 
 
 @database_sync_to_async
@@ -55,6 +56,10 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 django_asgi_app = get_asgi_application()
 
+# Writes results spooled before a restart without waiting for new ones
+if is_write_behind_enabled():
+    start_game_result_writer()
+
 application = ProtocolTypeRouter(
     {
         "http": django_asgi_app,
@@ -36,6 +36,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "djoser",
     "rest_framework.authtoken",
@@ -138,6 +139,13 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
 
+# Write-behind of single-player game results: results are spooled to a local file and
+# committed to the database in batches by a background thread
+GAME_RESULTS_WRITE_BEHIND = os.environ.get("GAME_RESULTS_WRITE_BEHIND", 0) == "1"
+GAME_RESULTS_SPOOL_PATH = os.environ.get("GAME_RESULTS_SPOOL_PATH", BASE_DIR / "spool" / "game_results.jsonl")
+GAME_RESULTS_WRITE_BATCH_SIZE = int(os.environ.get("GAME_RESULTS_WRITE_BATCH_SIZE", 500))
+GAME_RESULTS_WRITE_INTERVAL = float(os.environ.get("GAME_RESULTS_WRITE_INTERVAL", 1.0))
+
 
 if not is_dev:
     s3_settings = {
@@ -37,11 +37,15 @@ router.register("friendship", views.FriendshipViewSet, basename="friendship")
 urlpatterns = [
     path("", include(router.urls)),
     path("scoreboard/", views.get_scoreboard),
+    path("scoreboard/history/", views.get_scoreboard_history),
     path("statistics/calendar/", views.get_calendar_stats),
     path("statistics/total-days/", views.get_total_days),
     path("statistics/longest-streak/", views.get_longest_streak),
     path("statistics/current-streak/", views.get_current_streak),
     path("statistics/game-points/", views.get_game_points),
+    path("statistics/dashboard/", views.get_dashboard_stats),
+    path("statistics/activity/", views.get_activity_stats),
+    path("game-sessions/batch/", views.submit_game_sessions_batch),
     path("admin/", admin.site.urls),
     path("avatar-upload/", views.uploadAvatar, name="avatar-upload"),
     path("auth/", include("djoser.urls")),